@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""Measure translation throughput as the number of threads sharing a single decoder increases.
+
+On a free-threaded (no-GIL) CPython build throughput should scale with the number of threads, up to the number of
+available cores; with the GIL it will remain roughly flat. Usage:
+
+	python bench/concurrency.py [--functions N] [--seconds S] [--threads 1,2,4,8]
+"""
+
+from __future__ import print_function, unicode_literals
+
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+
+from marrow.dsl.block.function import FunctionTransformer
+from marrow.dsl.block.module import ModuleTransformer
+from marrow.dsl.core.decoder import GalfiDecoder
+from marrow.dsl.core.interface import Classifier
+
+
+class BenchClassifier(Classifier):
+	"""Just enough classification to exercise the module and function transformers."""
+	
+	priority = -2000
+	
+	def classify(self, context, line):
+		text = line.stripped
+		
+		if not text:
+			line.tag.add('blank')
+		elif text[0] == '#':
+			line.tag.add('comment')
+		elif text == 'end':
+			line.tag.add('_end')
+		elif text[0] == '@':
+			line.tag.update(('decorator', 'code'))
+		elif text.startswith('def '):
+			line.tag.update(('def', 'code'))
+		elif text.startswith('import ') or text.startswith('from '):
+			line.tag.update(('import', 'code'))
+		else:
+			line.tag.add('code')
+
+
+class BenchDecoder(GalfiDecoder):
+	__slots__ = ('_flags', )
+	
+	FLAGS = set()
+	
+	def __init__(self):
+		super(BenchDecoder, self).__init__('bench')
+		self._translators = sorted((BenchClassifier, ModuleTransformer, FunctionTransformer), key=lambda t: t.priority)
+
+
+def source(functions):
+	lines = ['"""Generated benchmark module."""', '', 'import os', '']
+	
+	for i in range(functions):
+		lines.extend((
+				'@decorator',
+				'def function_{}(a, b,'.format(i),
+				'		c=None):',
+				'	"""Docstring for function {}."""'.format(i),
+				'	',
+				'	value = (a +',
+				'			b)',
+				'	def inner():',
+				'		return value',
+				'	end',
+				'	return inner',
+				'end',
+				'',
+			))
+	
+	return '\n'.join(lines)
+
+
+def measure(decoder, text, expected, threads, seconds):
+	"""Return the number of translations per second completed by the given number of threads."""
+	
+	counts = [0] * threads
+	failures = []
+	deadline = []
+	barrier = threading.Barrier(threads + 1)
+	
+	def worker(index):
+		barrier.wait()
+		
+		while time.time() < deadline[0]:
+			if decoder(text) != expected:
+				failures.append(index)
+			
+			counts[index] += 1
+	
+	workers = [threading.Thread(target=worker, args=(i, )) for i in range(threads)]
+	
+	for thread in workers:
+		thread.start()
+	
+	start = time.time()
+	deadline.append(start + seconds)
+	barrier.wait()
+	
+	for thread in workers:
+		thread.join()
+	
+	assert not failures, "Concurrent use altered the result of translation."
+	
+	return sum(counts) / (time.time() - start)
+
+
+def main(argv=None):
+	parser = ArgumentParser(description=__doc__.partition('\n')[0])
+	parser.add_argument('--functions', type=int, default=50, help="functions in the generated source")
+	parser.add_argument('--seconds', type=float, default=2.0, help="duration of each measurement")
+	parser.add_argument('--threads', default='1,2,4,8', help="comma-separated thread counts to measure")
+	arguments = parser.parse_args(argv)
+	
+	gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+	decoder = BenchDecoder()
+	text = source(arguments.functions)
+	expected = decoder(text)
+	
+	print("Python {} with the GIL {}.".format(sys.version.split()[0], 'enabled' if gil else 'disabled'))
+	print("{:>8}  {:>14}  {:>8}".format("threads", "translations/s", "scaling"))
+	
+	baseline = None
+	
+	for threads in (int(i) for i in arguments.threads.split(',')):
+		rate = measure(decoder, text, expected, threads, arguments.seconds)
+		baseline = baseline or rate
+		print("{:>8}  {:>14.1f}  {:>7.2f}x".format(threads, rate, rate / baseline))
+	
+	print(decoder.stats)
+
+
+if __name__ == '__main__':
+	main()
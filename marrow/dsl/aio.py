@@ -0,0 +1,79 @@
+# encoding: utf-8
+
+"""Translation of DSL source from within an asyncio event loop, without blocking it.
+
+Translation is offloaded to an executor, by default the event loop's default thread pool. Concurrent requests to
+translate the same source using the same encoding are coalesced into a single in-flight translation.
+
+Requires Python 3.4 or newer.
+"""
+
+from __future__ import unicode_literals
+
+import asyncio
+from codecs import lookup
+from hashlib import sha1
+
+from .compat import str
+
+
+log = __import__('logging').getLogger(__name__)
+
+
+def _translate(source, encoding):
+	"""Translate UTF-8 encoded DSL source; executed within the executor, potentially in another process."""
+	
+	__import__('marrow.dsl.core.decoder')  # Ensure the galfi codec is registered within worker processes.
+	return lookup(encoding).decode(source)[0]
+
+
+class Translator(object):
+	"""Offload translation to an executor, coalescing concurrent requests for the same translation.
+	
+	Attributes:
+	
+	- `executor`: The `concurrent.futures` executor to offload to, or None for the event loop's default.
+	- `pending`: A mapping of in-flight translations to their futures.
+	"""
+	
+	__slots__ = ('executor', 'pending')
+	
+	def __init__(self, executor=None):
+		self.executor = executor
+		self.pending = {}
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({0.executor!r}, pending={1})'.format(self, len(self.pending))
+	
+	def translate(self, source, encoding, loop=None):
+		"""Return an awaitable resulting in the given DSL source translated using the named encoding.
+		
+		Cancelling the awaitable does not cancel the underlying translation other callers may also be awaiting.
+		"""
+		
+		loop = loop or asyncio.get_event_loop()
+		
+		if isinstance(source, str):
+			source = source.encode('utf8')
+		
+		key = (id(loop), sha1(source).hexdigest(), encoding)
+		future = self.pending.get(key)
+		
+		if future is None:
+			log.debug("Offloading translation of " + key[1] + " using " + encoding + " encoding.")
+			future = self.pending[key] = loop.run_in_executor(self.executor, _translate, source, encoding)
+			future.add_done_callback(lambda future: self.pending.pop(key, None))
+		
+		return asyncio.shield(future)
+
+
+translator = Translator()  # The default translator used by `translate`, offloading to the loop's default executor.
+
+
+def translate(source, encoding, loop=None):
+	"""Return an awaitable resulting in the given DSL source translated using the named encoding.
+	
+	Offloaded to the default `translator`, whose executor may be assigned to select an alternate thread or process pool.
+	"""
+	
+	return translator.translate(source, encoding, loop)
@@ -8,41 +8,52 @@ from ..exc import TranslationError
 def fetch_docstring(context, buffer):
 	"""Retrieve a docstring from the stream, placing the result into a specific buffer.
 	
-	This explicitly does not handle the pathalogical case of placing a comment at the end of the same line terminating
-	the docstring itself. Nor are string prefixes such as `r` or `u` handled. Please don't do these things to your
-	docstrings, they're silly.
+	The extent of the docstring is that of its logical line, as tracked by the context during classification. String
+	prefixes such as `r` or `u` are not handled. Please don't do this to your docstrings, it's silly.
 	
 	For use in block transformers handling module, class, or function scopes.
 	"""
 	
-	starting = None  # Line number the docstring begins on.
-	quotes = None  # The quotes detected as used to define the string literal.
+	logical = None  # The logical line of the docstring, tracked by the context as lines are classified.
 	
-	for line in context.only('code', 'blank'):  # Identify the docstring.
-		text = line.stripped
-		
-		if not quotes and text[0] not in ('"', "'"):
-			# Docstrings must be the first string literal within the scope.
-			context.push(line)
-			break
-		
-		if not quotes:  # Identify how the string literal is quoted.
-			quotes = (3 if text[:3].count(text[0]) == 3 else 1) * text[0]  # " " -> single quoted string
-			starting = line.number
+	for line in context.only('code', 'blank', 'continuation'):  # Identify the docstring.
+		if logical is None:
+			if line.stripped[:1] not in ('"', "'"):
+				# Docstrings must be the first string literal within the scope.
+				context.push(line)
+				break
+			
+			logical = line.logical
 		
 		# Append and annotate the line as being a docstring.
 		buffer.append(line.clone(tags=line.tag | {'docstring'}))
 		
-		if text.endswith(quotes):
+		if 'continued' not in line.tag:
 			break  # Stop if we've reached the end of the docstring.
 	
 	else:  # We've run out of matching source material.
-		if quotes:
+		if logical and logical.continued:
 			raise TranslationError(
-					"Unterminated docstring literal using {!r} starting on line {}.".format(quotes, starting),
-					quotes,
-					starting
+					"Unterminated docstring literal using {!r} starting on line {}.".format(logical.quote, logical.span[0]),
+					logical.quote,
+					logical.span[0]
 				)
 	
 	for line in context.only('blank'):
 		buffer.append(line)  # Blank lines trailing after the docstring are considered part of the docstring block.
+
+
+def essential(lines):
+	"""Filter out lines unnecessary to the behaviour of generated code, for the `production` flag.
+	
+	Docstrings are dropped, as are blank and comment lines of source, other than those continuing a logical line, e.g.
+	within a multi-line string literal. Generated lines are otherwise untagged, so retained.
+	"""
+	
+	for line in lines:
+		tag = line.tag
+		
+		if 'docstring' in tag or (tag & {'blank', 'comment'} and 'continuation' not in tag):
+			continue
+		
+		yield line
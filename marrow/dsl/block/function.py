@@ -3,8 +3,12 @@
 from __future__ import unicode_literals
 
 import re
+from collections import defaultdict as ddict
+from hashlib import sha1
 
-from .common import fetch_docstring
+from ..core.line import Line
+from ..core.util import deflate
+from .common import essential, fetch_docstring
 from .interface import BlockTransformer
 
 
@@ -18,7 +22,11 @@ class FunctionTransformer(BlockTransformer):
 	Tracks:
 	
 	* `name` - the name of the function
+	* `kind` - the context flag and scope name claimed, either `function` or `closure`
 	* `buffer` - the named collection of buffers
+	* `_imports` - with the `imports-local` option, the module's imports set aside while the function is processed
+	* `_outer` - the enclosing closure, if this closure is nested within another, restored as the scope on exit
+	* `_slot` - with the `instrument` flag, the source line number of the declaration, naming the function's metric slot
 	
 	Functions are divided into:
 	
@@ -31,11 +39,13 @@ class FunctionTransformer(BlockTransformer):
 	* `trailer`
 	"""
 	
-	__slots__ = ('name', )
+	__slots__ = ('name', 'kind', '_imports', '_outer', '_slot')
 	__buffers__ = ('decorator', 'declaration', 'docstring', 'prefix', 'function', 'suffix', 'trailer')
 	__buffer_default__ = 'function'
 	
 	priority = -900
+	incremental = True
+	__positional__ = ('instrument', )  # Metric slots are named after the line of the declaration.
 	
 	# Patterns to search for bare *, *args, or **kwargs declarations.
 	STARARGS = re.compile(r'(^|,\s*)\*([^*\s,]+|\s*,|$)')
@@ -45,6 +55,10 @@ class FunctionTransformer(BlockTransformer):
 		super(FunctionTransformer, self).__init__(decoder)
 		
 		self.name = None
+		self.kind = None
+		self._imports = None
+		self._outer = None
+		self._slot = None
 		
 		for buf in ('docstring', 'prefix', 'function', 'suffix', 'trailer'):
 			self.buffer[buf].scope = 1
@@ -54,16 +68,19 @@ class FunctionTransformer(BlockTransformer):
 		"""Match code lines using the "def" keyword."""
 		
 		if 'decorator' in line.tag:  # Dig a little more to identify if these are decorating a function.
-			lines = list(context.only('decorator', 'comment', 'blank'))  # Extract decorators.
-			line, = list(context.only('def', 'class'))  # Find the declaration.
-			lines.append(line)  # Add the declaration to our list of lines.
-			context.push(*lines)  # Put everything back.
+			line = context.lookahead(cls._declaration)  # Find the declaration following any further decorators.
+			if line is None: return False
 		
 		return 'def' in line.tag
 	
-	def __call__(self, context):
+	@staticmethod
+	def _declaration(line):
+		return not line.tag & {'decorator', 'comment', 'blank'}
+	
+	def enter(self, context):
 		buffer = self.buffer
-		kind = 'closure' if 'function' in context else 'function'
+		kind = self.kind = 'closure' if 'function' in context else 'function'
+		self._outer = context.scopes.get(kind)
 		context.add(kind)
 		context[kind] = self
 		
@@ -73,11 +90,17 @@ class FunctionTransformer(BlockTransformer):
 		for line in context.only('decorator', 'comment', 'blank'):
 			buffer['decorator'].append(line)
 		
-		declaration = self.process_declaration(context, context.only('def', 'continued'))
-		buffer['declaration'].append(*declaration)
+		declaration = [context.pull()]  # The declaration, followed by any physical lines continuing it.
+		declaration.extend(context.only('continuation'))
+		buffer['declaration'].append(*self.process_declaration(context, declaration))
 		
 		fetch_docstring(context, buffer['docstring'])
 		
+		module = getattr(context, 'module', None)
+		
+		if module and getattr(context.decoder, 'imports', None) == 'local':  # Collect imports requested within.
+			self._imports, module._imports = module._imports, ddict(set)
+		
 		if __debug__:
 			log.debug('{} context prepared:\n\t{}'.format(
 					kind.title(),
@@ -86,13 +109,34 @@ class FunctionTransformer(BlockTransformer):
 		
 		self.ingress(context)
 		
-		for line in context.stream:
-			if '_end' not in line.tag:
-				buffer.append(line)
+		return ()
+	
+	def exit(self, context):
+		buffer = self.buffer
+		kind = self.kind
+		
+		if 'production' in context or 'instrument' in context:  # Ensure a body remains once trimmed or wrapped.
+			if not any(line.stripped for line in essential(buffer['function'].window())):
+				buffer['function'].append(Line('pass', self._number(buffer['declaration'].window())))
 		
 		self.egress(context)
-		context.remove(kind)
-		del context[kind]
+		
+		if self._outer is None:
+			context.remove(kind)
+			del context[kind]
+		else:  # Closures may nest arbitrarily deeply.
+			context[kind], self._outer = self._outer, None
+		
+		if self._imports is not None:  # Emit imports requested within this function at the top of its body.
+			module = context.module
+			imports, module._imports, self._imports = module._imports, self._imports, None
+			
+			if '__future__' in imports:
+				module._imports['__future__'].update(imports.pop('__future__'))
+			
+			for package, objs in sorted(imports.items()):
+				if objs:
+					buffer['prefix'].append('from {} import {}'.format(package, ', '.join(sorted(objs))))
 		
 		if __debug__:
 			log.debug('{} complete:\n\t{}'.format(
@@ -100,21 +144,127 @@ class FunctionTransformer(BlockTransformer):
 					repr(buffer).replace('), ', ')\n\t\t')
 				))
 		
-		# Produce the buffered results.
-		for line in buffer:
-			yield line
+		lines = buffer
+		header = None
+		
+		if 'production' in context:
+			lines, header = self.trim(buffer)
+		
+		if kind == 'function':  # Closures are transformed as part of their enclosing function.
+			if header is None:
+				header = sum(len(buffer[name]) for name in ('decorator', 'declaration', 'docstring'))
+			
+			lines = self.rewrite(context, lines)
+			
+			shared = None
+			
+			if getattr(context.decoder, 'dedupe', None):
+				lines = list(lines)  # Retained should the function not be shared.
+				shared = self.dedupe(context, lines, header)
+			
+			if shared is not None:
+				lines = shared
+			elif getattr(context.decoder, 'lazy', None):
+				lines = self.defer(context, lines, header)
+			
+			if 'instrument' in context:  # Allocate the function's slot prior to its definition.
+				lines = list(lines)
+				lines.insert(0, Line('__table__, __metric_{0}__ = __metrics__.slot(__name__, {1!r}, {0})'.format(
+						self._slot, str(self.name)), self._number(lines), 0))
+			
+			return lines
+		
+		return lines  # Produce the buffered results.
 	
-	def process_declaration(self, context, declaration):
-		lines = list(declaration)
-		logical = []
+	def trim(self, buffer):
+		"""Drop the docstring and inessential lines, returning the remaining lines and the number forming the header.
 		
-		for line in lines:
-			line = line.line.rstrip('\\') if 'continued' in line.tag else line.line
-			line.rstrip()
-			logical.append(line)
-			if line[-1] == ',': logical.append(' ')
+		The header is that retained of the decorators and declaration.
+		"""
+		
+		decorators = list(essential(buffer['decorator']))
+		declaration = list(buffer['declaration'])
+		body = list(essential(buffer))  # The docstring, then the remainder of the function.
+		
+		return decorators + declaration + body, len(decorators) + len(declaration)
+	
+	def defer(self, context, lines, header):
+		"""Replace a function of at least `lazy` lines with a stub compiling it on first call; see `marrow.dsl.lazy`.
+		
+		The first `header` lines, the decorators, declaration, and docstring, are retained by the stub. The stub's own
+		decorator is innermost, so that any other decorators, including those wrapping it, receive the stub.
+		"""
+		
+		lines = list(lines)
+		
+		if len(lines) < context.decoder.lazy or header >= len(lines):
+			return lines
+		
+		if any(line.stripped.startswith('async ') for line in lines[:header]):
+			return lines  # Coroutines are left to compile eagerly.
+		
+		start = next((i for i, line in enumerate(lines) if 'def' in line.tag), None)
+		
+		if start is None or start >= header:
+			return lines
+		
+		if __debug__:
+			log.debug("Deferring compilation of function: " + self.name)
 		
-		logical = ''.join(logical)
+		context.module._imports['marrow.dsl.lazy'].add('__lazy__')
+		
+		# The source is stored with a blank line in place of the stub's own decorator.
+		source = [str(line) for line in lines]
+		source.insert(start, "")
+		payload = deflate("\n".join(source))
+		declaration = lines[start]
+		body = lines[header]
+		
+		stub = lines[:start]
+		stub.append(Line('@__lazy__.stub(b"' + payload + '")', declaration.number, declaration.scope))
+		stub.extend(lines[start:header])
+		stub.append(Line('return __lazy__(locals())', body.number, body.scope))
+		stub.extend(Line('', line.number) for line in lines[header + 1:])  # Pad to retain line positions.
+		
+		return stub
+	
+	def dedupe(self, context, lines, header):
+		"""Replace a function of at least `dedupe` lines with a stub sharing its implementation; see `marrow.dsl.dedupe`.
+		
+		The first `header` of the given list of lines, the decorators, declaration, and docstring, are retained by the
+		stub. Returns None if the function is not replaced.
+		"""
+		
+		if len(lines) < context.decoder.dedupe or header >= len(lines):
+			return None
+		
+		# Decorators are applied to the stub, in each module, thus are excluded from the shared implementation.
+		start = next((i for i, line in enumerate(lines) if 'def' in line.tag), None)
+		
+		if start is None or start >= header:
+			return None
+		
+		source = "\n".join(str(line) for line in lines[start:])
+		digest = sha1(source.encode('utf8')).hexdigest()
+		declaration = lines[start]
+		body = lines[header]
+		
+		if __debug__:
+			log.debug("Sharing implementation of function " + self.name + ": " + digest)
+		
+		context.module._imports['marrow.dsl.dedupe'].add('__dedupe__')
+		
+		stub = lines[:start]
+		stub.append(Line("@__dedupe__('" + digest + "', b\"" + deflate(source) + "\")", declaration.number,
+				declaration.scope))
+		stub.extend(lines[start:header])
+		stub.append(Line('pass', body.number, body.scope))
+		
+		return stub
+	
+	def process_declaration(self, context, declaration):
+		lines = list(declaration)
+		logical = lines[0].logical.text if lines[0].logical else ' '.join(line.stripped for line in lines)
 		
 		self.name = logical.partition(' ')[2].lstrip().partition('(')[0].rstrip()
 		
@@ -133,6 +283,37 @@ class FunctionTransformer(BlockTransformer):
 		"""Code to be executed when exiting the context of a function.
 		
 		Always call super() last in any subclasses.
+		
+		If the `instrument` flag is set, wraps the body of top-level functions to record their call count and duration;
+		see `marrow.dsl.metrics`.
 		"""
 		
-		pass
+		if self.kind != 'function' or 'instrument' not in context:
+			return
+		
+		buffer = self.buffer
+		self._slot = self._number(buffer['declaration'].window())  # Not the decorators, which are optional.
+		slot = '__metric_{}__'.format(self._slot)
+		imports = context.module._imports
+		imports['marrow.dsl.metrics'].add('registry as __metrics__')
+		imports['timeit'].add('default_timer as __clock__')
+		
+		for name in ('prefix', 'function', 'suffix'):  # Indent the body within the try block.
+			buffer[name].scope += 1
+		
+		buffer['prefix'].push(Line('__started__ = __clock__()', scope=-1), Line('try:', scope=-1))
+		buffer['suffix'].append(
+				Line('finally:', scope=-1),
+				Line('__table__.counts[' + slot + '] += 1'),
+				Line('__table__.times[' + slot + '] += __clock__() - __started__'),
+			)
+	
+	@staticmethod
+	def _number(lines):
+		"""The source line number of the first numbered line given, identifying the function."""
+		
+		for line in lines:
+			if line.number:
+				return line.number
+		
+		return 0
@@ -4,6 +4,7 @@ from __future__ import unicode_literals
 
 from ..core.interface import Transformer
 from ..core.lines import Lines
+from ..tree.common import transform
 
 
 class BlockTransformer(Transformer):
@@ -14,9 +15,12 @@ class BlockTransformer(Transformer):
 	
 	__slots__ = ('buffer')
 	__buffers__ = ()
-	__buffer_tags__ = set()
+	__buffer_tags__ = frozenset()
 	__buffer_default__ = None
 	
+	incremental = False  # May top-level instances be recalled from the decoder's block cache?
+	__positional__ = ()  # Context flags under which output refers to absolute line numbers, and may not be recalled.
+	
 	def __init__(self, decoder):
 		super(BlockTransformer, self).__init__(decoder)
 		
@@ -27,7 +31,49 @@ class BlockTransformer(Transformer):
 		raise NotImplementedError()
 	
 	def __call__(self, context):
-		raise NotImplementedError()
+		"""Adapt the `enter`, `feed`, and `exit` events to the generator protocol used by `Context.stream`.
+		
+		Subclasses not implementing `enter` must override this to implement the generator protocol directly.
+		"""
+		
+		if not hasattr(self, 'enter'):
+			raise NotImplementedError()
+		
+		for line in self.enter(context):
+			yield line
+		
+		for line in context.stream:
+			for line in self.feed(context, line):
+				yield line
+		
+		for line in self.exit(context):
+			yield line
+	
+	def feed(self, context, line):
+		"""Buffer a line of input, or output from a nested scope, returning any lines to emit to the parent scope.
+		
+		Scope terminating `_end` lines are delivered here prior to `exit` and are not buffered.
+		"""
+		
+		if '_end' not in line.tag:
+			self.buffer.append(line)
+		
+		return ()
+	
+	def rewrite(self, context, lines):
+		"""Apply AST transformation to buffered output on exit, returning the lines to produce in its place.
+		
+		Applies the optimizer passes selected by the decoder's `optimize` option, if any.
+		"""
+		
+		spec = getattr(context.decoder, 'optimize', None)
+		
+		if not spec:
+			return lines
+		
+		from ..tree.optimize import passes  # Deferred; requires a Python 3 abstract syntax tree.
+		
+		return transform(lines, passes(spec))
 	
 	def __getitem__(self, name):
 		return self.buffer[name]
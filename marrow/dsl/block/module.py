@@ -6,9 +6,9 @@ from collections import defaultdict as ddict
 
 from ..compat import py2, str
 from ..core import Line
-from .common import fetch_docstring
+from .common import essential, fetch_docstring
 from .interface import BlockTransformer
-from .util import redelta_encode
+from ..core.util import redelta_encode
 
 
 log = __import__('logging').getLogger(__name__)
@@ -18,30 +18,37 @@ class ModuleTransformer(BlockTransformer):
 	"""Module transformer.
 	
 	This is the initial scope, and the highest priority to ensure its processing of the preamble happens first.
+	
+	When a DSL's decoder accepts, and is given, the `production` flag, the generated module is trimmed: module
+	comments, docstrings, and blank and comment lines not within a logical line are dropped, and the line number
+	mapping, if needed, is emitted compactly on a single trailing line. Functions are trimmed as they exit.
 	"""
 	
-	__slots__ = ('imports')
+	__slots__ = ('_imports', )
 	
-	__buffers__ = ('comment', 'docstring', '_imports', 'prefix', 'module', 'suffix')
-	__buffer_tags__ = {'module'}
+	__buffers__ = ('comment', 'docstring', 'imports', 'prefix', 'module', 'suffix')
+	__buffer_tags__ = frozenset({'module'})
 	__buffer_default__ = 'module'
 	
 	priority = -1000
 	
-	FUTURES = {'absolute_import', 'division', 'print_function', 'unicode_literals'}
+	FUTURES = frozenset({'absolute_import', 'division', 'print_function', 'unicode_literals'})
 	
 	def __init__(self, decoder):
 		super(ModuleTransformer, self).__init__(decoder)
 		
 		# Prepare our module-scoped buffers.
 		self.module.tag.discard('module')
+		
+		if getattr(decoder, 'spill', None):  # Bound memory use by spilling the module body to disk.
+			self.module.spill = int(decoder.spill)
 		self._imports = ddict(set)
 	
 	@classmethod
 	def match(cls, context, line):
 		return 'init' not in context
 	
-	def __call__(self, context):
+	def enter(self, context):
 		if __debug__:
 			log.debug("Preparing module context.")
 		
@@ -53,18 +60,19 @@ class ModuleTransformer(BlockTransformer):
 			log.debug("Module context prepared:\n\t" + repr(buffer).replace('), ', ')\n\t\t'))
 		
 		for line in context.only('comment', 'blank'):  # Pull out any module comment prefix, e.g. encoding, shbang, etc.
-			buffer.comment.append(line)
+			buffer['comment'].append(line)
 		
 		fetch_docstring(context, buffer['docstring'])
 		
 		for line in context.only('import', 'blank'):
-			buffer.imports.append(line)
+			buffer['imports'].append(line)
 		
 		self.ingress(context)  # Easy subclass hook to perform any additional work just prior to entering the stream.
 		
-		for line in context.stream:
-			if '_end' not in line.tag:
-				buffer.append(line)
+		return ()
+	
+	def exit(self, context):
+		buffer = self.buffer
 		
 		self.egress(context)  # Easy subclass hook to perform any additional work prior to line mapping.
 		
@@ -73,19 +81,23 @@ class ModuleTransformer(BlockTransformer):
 		
 		# Finally, emit the buffered result.
 		
+		production = 'production' in context  # Drop module comments, docstrings, and inessential lines.
+		
 		if 'nomap' in context:
-			for line in buffer:
-				yield line
-			return
+			return essential(buffer) if production else buffer
 		
-		for line in self.emit_with_mapping(buffer):
-			yield line
+		return self.emit_with_mapping(buffer, production)
 	
-	def emit_with_mapping(self, buffer):
+	def emit_with_mapping(self, buffer, production=False):
+		"""Emit the buffered lines, followed by a mapping of line numbers back to the source if lines were moved.
+		
+		In production the mapping is a single trailing line, following all code to leave its line numbers unaffected.
+		"""
+		
 		needs_mapping = None if 'nomap' in buffer else False
 		mapping = []
 		
-		for line in buffer:
+		for line in (essential(buffer) if production else buffer):
 			if needs_mapping is False:
 				if not needs_mapping and (not line.number or (mapping and mapping[-1] != line.number - 1)):
 					needs_mapping = True
@@ -96,12 +108,14 @@ class ModuleTransformer(BlockTransformer):
 			yield line
 		
 		if needs_mapping:  # Map line numbers to aid in debugging, but only if lines were added or re-ordered.
-			yield Line("")
-			yield Line("# Line number mappings for translating errors back to the source file.")
-			yield Line('__gzmapping__ = b"' + redelta_encode(mapping).replace('"', '\"') + '"')
+			if not production:
+				yield Line("")
+				yield Line("# Line number mappings for translating errors back to the source file.")
+			
+			yield Line('__gzmapping__ = b"' + redelta_encode(i if i > 0 else None for i in mapping) + '"')
 			
 			# Uncompressed version for readability in development.
-			if __debug__:
+			if __debug__ and not production:
 				yield Line('__mapping__ = [' + ','.join(str(i) for i in mapping) + ']')
 	
 	def ingress(self, context):
@@ -129,11 +143,27 @@ class ModuleTransformer(BlockTransformer):
 			# TODO: Split stdlib from third-party. Ref: sys.builtin_module_names
 			# TODO: Make module ordering style configurable.
 			
+			deferred = []
+			
+			if getattr(context.decoder, 'imports', None) == 'lazy':  # Proxy all but star imports; see marrow.dsl.lazy.
+				for package, objs in sorted(imports.items()):
+					objs = sorted(obj for obj in objs if obj != '*')
+					
+					if objs and package != 'marrow.dsl.lazy':
+						deferred.append('__lazy__.imports(globals(), {})'.format(', '.join("'" + i + "'" for i in [package] + objs)))
+						imports[package].difference_update(objs)
+				
+				if deferred:
+					imports['marrow.dsl.lazy'].add('__lazy__')
+			
 			for package, objs in sorted(imports.items()):
 				if not objs: continue  # Skip queried, but empty packages.
 				self.imports.append('from {} import {}'.format(package, ', '.join(sorted(objs))))
 			
+			if deferred:
+				self.imports.append('', *deferred)
+			
 			self.imports.append('', '')
 			
 			if futures:
-				self.imports.push('from __future__ import ' + ', '.join(sorted(imports.pop('__future__'))), '')
+				self.imports.push('from __future__ import ' + ', '.join(sorted(futures)), '')
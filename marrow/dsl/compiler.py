@@ -0,0 +1,186 @@
+# encoding: utf-8
+
+"""In-process translation and compilation of DSL source held in strings, e.g. templates stored in a database.
+
+Code objects are cached in a bounded LRU keyed by a digest of the source, the canonical encoding name, and the
+identity of its decoder: its flags, options, and the versions of its translators. They may optionally be persisted using `marshal` to a cache directory shared between processes, or to memory shared with
+forked worker processes; see `marrow.dsl.shared`.
+"""
+
+from __future__ import unicode_literals
+
+import json
+import marshal
+import os
+from binascii import unhexlify
+from codecs import lookup
+from hashlib import sha1
+from tempfile import NamedTemporaryFile
+from types import ModuleType
+
+from .compat import py2, str
+from .core.cache import LRU
+from .core.decoder import decoder
+
+try:
+	from importlib.util import MAGIC_NUMBER
+except ImportError:  # pragma: no cover
+	from imp import get_magic
+	MAGIC_NUMBER = get_magic()
+
+
+log = __import__('logging').getLogger(__name__)
+
+
+class Compiler(object):
+	"""Translate and compile DSL source to code objects, caching the results.
+	
+	Attributes:
+	
+	- `cache`: The LRU of code objects, keyed by digest.
+	- `directory`: The optional path to persist marshalled code objects to.
+	- `shared`: An optional `SharedCache` to store marshalled code objects within, consulted prior to the directory.
+	"""
+	
+	__slots__ = ('cache', 'directory', 'shared')
+	
+	def __init__(self, size=128, directory=None, shared=None):
+		self.cache = LRU(size)
+		self.directory = directory
+		self.shared = shared
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({0.cache!r}, directory={0.directory!r}, shared={0.shared!r})'.format(self)
+	
+	@staticmethod
+	def identify(encoding):
+		"""Describe the decoder of the named encoding: its flags, options, and translator versions.
+		
+		Upgrading a translator changes its output, thus the identity of the decoder, without changing the encoding
+		name. Whether assertions are enabled is included, as it determines whether debugging aids are generated.
+		"""
+		
+		instance = decoder(encoding)
+		
+		if instance is None:
+			return None
+		
+		return [sorted(instance.flags), instance.options, instance.versions, __debug__]
+	
+	@staticmethod
+	def digest(source, encoding, identity=None):
+		"""Identify a source, given as UTF-8 encoded bytes, translated using the named (canonical) encoding.
+		
+		The `identity` of the encoding's decoder, as returned by `identify`, distinguishes translations performed by
+		differing versions of its translators.
+		"""
+		
+		identity = json.dumps(identity, sort_keys=True, default=str).encode('utf8')
+		return sha1(encoding.encode('ascii') + b'\0' + identity + b'\0' + source).hexdigest()
+	
+	def translate(self, source, encoding):
+		"""Translate the given DSL source, returning the resulting Python source and the canonical encoding name."""
+		
+		if isinstance(source, str):
+			source = source.encode('utf8')
+		
+		info = lookup(encoding)
+		return info.decode(source)[0], info.name
+	
+	def compile(self, source, encoding):
+		"""Translate and compile the given DSL source, returning a code object."""
+		
+		if isinstance(source, str):
+			source = source.encode('utf8')
+		
+		info = lookup(encoding)
+		digest = self.digest(source, info.name, self.identify(info.name))
+		code = self.cache.get(digest)
+		
+		if code is not None:
+			return code
+		
+		code = self._load(digest)
+		
+		if code is None:
+			log.debug("Compiling " + digest + " using " + info.name + " encoding.")
+			code = compile(info.decode(source)[0], '<' + info.name + ':' + digest[:12] + '>', 'exec')
+			self._store(digest, code)
+		
+		self.cache.set(digest, code)
+		
+		return code
+	
+	def load(self, source, encoding, name=None):
+		"""Translate, compile, and execute the given DSL source, returning the resulting module namespace."""
+		
+		code = self.compile(source, encoding)
+		module = ModuleType(str(name or code.co_filename))
+		module.__file__ = code.co_filename
+		
+		exec(code, module.__dict__)
+		
+		return module
+	
+	def _path(self, digest):
+		return os.path.join(self.directory, digest + ('.py2c' if py2 else '.pyc'))
+	
+	def _load(self, digest):
+		"""Retrieve a persisted code object, if present and produced by a compatible runtime."""
+		
+		if self.shared is not None:
+			data = self.shared.get(unhexlify(digest))
+			
+			if data is not None and data[:len(MAGIC_NUMBER)] == MAGIC_NUMBER:
+				return marshal.loads(data[len(MAGIC_NUMBER):])
+		
+		if not self.directory:
+			return None
+		
+		try:
+			with open(self._path(digest), 'rb') as fh:
+				data = fh.read()
+			
+			if data[:len(MAGIC_NUMBER)] != MAGIC_NUMBER:
+				return None
+			
+			code = marshal.loads(data[len(MAGIC_NUMBER):])
+		
+		except (IOError, OSError, EOFError, ValueError, TypeError):
+			return None
+		
+		if self.shared is not None:  # Share code persisted by a prior process with every worker.
+			self.shared.set(unhexlify(digest), data)
+		
+		return code
+	
+	def _store(self, digest, code):
+		"""Persist a code object to the shared cache and, atomically, to the cache directory, if configured."""
+		
+		if self.shared is not None:
+			self.shared.set(unhexlify(digest), MAGIC_NUMBER + marshal.dumps(code))
+		
+		if not self.directory:
+			return
+		
+		try:
+			with NamedTemporaryFile('wb', dir=self.directory, delete=False) as fh:
+				fh.write(MAGIC_NUMBER)
+				marshal.dump(code, fh)
+			
+			getattr(os, 'replace', os.rename)(fh.name, self._path(digest))
+		
+		except (IOError, OSError) as e:
+			log.warning("Unable to persist compiled DSL code object " + digest + ": " + str(e))
+
+
+compiler = Compiler()  # The default, process-wide compiler used by `compile_string`.
+
+
+def compile_string(source, encoding, name=None):
+	"""Translate, compile, and execute DSL source using the given encoding, returning the resulting module namespace.
+	
+	Compilation is cached by the default `compiler`, whose cache directory may be assigned to persist results.
+	"""
+	
+	return compiler.load(source, encoding, name)
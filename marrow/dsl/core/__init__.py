@@ -4,4 +4,6 @@ from .buffer import Buffer
 from .context import Context
 from .interface import Classifier, Transformer
 from .line import Line
+from .logical import LogicalLine
 from .lines import Lines
+from .template import Template
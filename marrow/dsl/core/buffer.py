@@ -2,14 +2,17 @@
 
 from __future__ import unicode_literals
 
+import marshal
 from collections import deque
+from itertools import islice
+from tempfile import TemporaryFile
 
 from ..compat import py2, str
 from .line import Line
 
 
 class Buffer(object):
-	"""An annotated iterable (and not seekable or indexable) buffer of lines.
+	"""An annotated iterable (and not seekable) buffer of lines, with a read-only window over upcoming lines.
 	
 	The entire buffer may have tags associated with it; these are inherited by lines within the buffer.
 	
@@ -18,12 +21,18 @@ class Buffer(object):
 	- `scope`: The scope level added to every line when iterated.
 	- `lines`: The buffer of individual Line instances.
 	- `tag`: A set of tags to associate with each line when iterated.
-	- 
+	- `spill`: The number of lines to hold in memory before spilling appended lines to disk, if any.
+	- `spool`: The temporary file lines have been spilled to, if any.
+	- `spooled`: The number of lines waiting within the spool.
+	- `offset`: The position within the spool of the next line to read back.
+	
+	Spilled lines are compactly serialized using `marshal`, retaining their text, number, scope, and tags, and are
+	read back in batches of `spill` lines as the buffer is consumed.
 	"""
 	
-	__slots__ = ('scope', 'lines', 'tag')
+	__slots__ = ('scope', 'lines', 'tag', 'spill', 'spool', 'spooled', 'offset')
 	
-	def __init__(self, lines, scope=0, tags=None):
+	def __init__(self, lines, scope=0, tags=None, spill=None):
 		"""Construct a new buffer.
 		
 		You may define a base scope (added to all line scopes when iterated) and tag set. "Private tags" prefixed with
@@ -33,12 +42,16 @@ class Buffer(object):
 		self.lines = deque((Line(l, i+1) for i, l in enumerate(lines.split("\n"))) if isinstance(lines, str) else lines)
 		self.scope = scope
 		self.tag = set(tags) if tags else set()
+		self.spill = spill
+		self.spool = None
+		self.spooled = 0
+		self.offset = 0
 	
 	@property
 	def count(self):
 		"""Retrieve the total number of lines stored in this buffer."""
 		
-		return len(self.lines)
+		return len(self.lines) + self.spooled
 	
 	def __len__(self):
 		"""Conform to Python API expectations for length retrieval."""
@@ -73,6 +86,8 @@ class Buffer(object):
 	def next(self):
 		"""Retrieve and remove (pull) the first line in the next non-empty buffer or raise StopIteration."""
 		
+		if self.spooled: self._fill(1)
+		
 		if not self.lines:
 			raise StopIteration()
 		
@@ -82,6 +97,8 @@ class Buffer(object):
 	def pull(self):
 		"""Retrieve and remove (pull) the first line in the next non-empty buffer or return None."""
 		
+		if self.spooled: self._fill(1)
+		
 		if not self.lines:
 			return None
 		
@@ -91,18 +108,88 @@ class Buffer(object):
 	def peek(self):
 		"""Retrieve the next line without removing it from its buffer, or None if there are no lines available."""
 		
+		if self.spooled: self._fill(1)
+		
 		if not self.lines:
 			return None
 		
 		line = self.lines[0]
 		return line.clone(scope=self.scope + (line.scope or 0), tags=self.tag | line.tag)
 	
+	def window(self, count=None):
+		"""Iterate up to `count` upcoming lines (or all of them) without removing or cloning them.
+		
+		These are the stored Line instances themselves, without buffer scope or tags applied; they may be annotated,
+		but should otherwise be treated as read-only.
+		"""
+		
+		if self.spooled: self._fill(self.count if count is None else count)
+		
+		return islice(self.lines, count)
+	
+	def drop(self, count):
+		"""Discard up to `count` lines from the head (left edge) of the buffer without retrieving them."""
+		
+		if self.spooled: self._fill(count)
+		
+		lines = self.lines
+		
+		for i in range(min(count, len(lines))):
+			lines.popleft()
+	
 	def push(self, *lines):
 		"""Push one or more lines back to the head (left edge) as if they were never pulled."""
 		
 		self.lines.extendleft((line if isinstance(line, Line) else Line(line)) for line in reversed(lines))
 	
 	def append(self, *lines):
-		"""Append one or more lines to the tail (right edge) of the buffer."""
+		"""Append one or more lines to the tail (right edge) of the buffer, spilling to disk if over threshold."""
+		
+		lines = ((line if isinstance(line, Line) else Line(line)) for line in lines)
+		
+		if self.spooled:  # Lines already spilled must be read back before any appended after them.
+			self._write(lines)
+			return
+		
+		memory = self.lines
+		memory.extend(lines)
+		
+		if self.spill and len(memory) > self.spill:
+			overflow = [memory.pop() for i in range(len(memory) - self.spill)]
+			overflow.reverse()
+			self._write(overflow)
+	
+	def _write(self, lines):
+		"""Serialize lines to the tail of the spool."""
+		
+		spool = self.spool
+		
+		if spool is None:
+			spool = self.spool = TemporaryFile()
+		
+		spool.seek(0, 2)
+		
+		for line in lines:
+			marshal.dump((line.line, line.number, line.scope, tuple(line.tag)), spool)
+			self.spooled += 1
+	
+	def _fill(self, count):
+		"""Read back spilled lines until at least `count` lines are held in memory, or the spool is exhausted."""
+		
+		spool = self.spool
+		memory = self.lines
+		
+		if len(memory) < count:
+			spool.seek(self.offset)
+			
+			for i in range(min(max(count - len(memory), self.spill or 1), self.spooled)):
+				line, number, scope, tags = marshal.load(spool)
+				memory.append(Line(line, number, scope, tags))
+				self.spooled -= 1
+			
+			self.offset = spool.tell()
 		
-		self.lines.extend((line if isinstance(line, Line) else Line(line)) for line in lines)
+		if not self.spooled:  # Discard the exhausted spool.
+			spool.close()
+			self.spool = None
+			self.offset = 0
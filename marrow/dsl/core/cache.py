@@ -0,0 +1,64 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRU(object):
+	"""A bounded, thread-safe mapping discarding the least recently used entries once full.
+	
+	Attributes:
+	
+	- `size`: The maximum number of entries to retain.
+	- `data`: The ordered mapping of entries, least recently used first.
+	- `lock`: Serializes access to the mapping.
+	"""
+	
+	__slots__ = ('size', 'data', 'lock')
+	
+	def __init__(self, size):
+		self.size = int(size)
+		self.data = OrderedDict()
+		self.lock = Lock()
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({1}/{0.size})'.format(self, len(self.data))
+	
+	def __len__(self):
+		return len(self.data)
+	
+	def __contains__(self, key):
+		return key in self.data
+	
+	def get(self, key, default=None):
+		"""Retrieve an entry, marking it as most recently used, or return the default."""
+		
+		data = self.data
+		
+		with self.lock:
+			try:
+				value = data.pop(key)
+			except KeyError:
+				return default
+			
+			data[key] = value
+		
+		return value
+	
+	def set(self, key, value):
+		"""Store an entry as the most recently used, discarding the least recently used if over capacity."""
+		
+		data = self.data
+		
+		with self.lock:
+			data.pop(key, None)
+			data[key] = value
+			
+			while len(data) > self.size:
+				data.popitem(last=False)
+	
+	def clear(self):
+		with self.lock:
+			self.data.clear()
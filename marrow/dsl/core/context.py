@@ -4,6 +4,10 @@ from __future__ import unicode_literals
 
 from ..compat import py2, str
 from .buffer import Buffer
+from .line import Line
+from .logical import LogicalLine
+from .prescan import prescan
+from .stats import Statistics
 
 
 log = __import__('logging').getLogger(__name__)
@@ -14,22 +18,36 @@ class Context(object):
 	
 	"""
 	
-	__slots__ = ('decoder', 'input', 'flag', 'scope', 'buffers', 'scopes', 'classifiers', 'transformers')
+	__slots__ = ('decoder', 'input', 'flag', 'scope', 'buffers', 'scopes', 'classifiers', 'transformers', 'module', 'logical', 'depends', 'structure', 'source', 'recording', 'stats')
 	
 	def __init__(self, decoder, input, translators):
 		log.debug("Constructing new context.")
 		
 		self.decoder = decoder
+		self.stats = Statistics()  # Counters for this translation alone, merged into the decoder's on completion.
+		self.structure = None  # The results of pre-scanning textual input.
+		self.source = None  # The physical lines of textual input.
+		self.recording = None  # The top-level block being translated for retention by the decoder's block cache.
+		
+		if isinstance(input, str):  # Seed the base tags of every line from a bulk pre-scan of the input.
+			structure = self.structure = prescan(input)
+			source = self.source = input.split("\n")
+			tags = structure.tags
+			input = [Line(text, i + 1, tags=tags(i)) for i, text in enumerate(source)]
+		
 		self.input = Buffer(input)
 		self.flag = set(decoder.flags)
 		self.classifiers = []
+		self.depends = set()  # Context flags the classifiers depend upon.
 		self.transformers = []
 		self.buffers = []
 		self.scopes = {}
+		self.logical = None  # The logical line most recently tracked.
 		
 		for translator in translators:
 			if hasattr(translator, 'classify'):
 				self.classifiers.append(translator(decoder).classify)
+				self.depends.update(getattr(translator, '__depends__', ()))
 			
 			if hasattr(translator, 'match'):
 				self.transformers.append(translator)
@@ -61,10 +79,59 @@ class Context(object):
 		return self.buffers[0] if self.buffers else None
 	
 	def classify(self, line):
-		if 'classified' not in line.tag:
-			line.tag.add('classified')
+		if 'classified' in line.tag:
+			return
+		
+		line.tag.add('classified')
+		self.track(line)
+		
+		stats = self.stats
+		cache = self.decoder._cache
+		stats.lines += 1
+		
+		if cache is None or line.tag & {'continued', 'continuation'}:  # Logical lines may span physical lines.
 			for classify in self.classifiers:
 				classify(self, line)
+			
+			return
+		
+		key = (line.line, frozenset(line.tag), frozenset(self.flag & self.depends))
+		tags = cache.get(key)
+		
+		if tags is not None:
+			stats.hits += 1
+			line.tag |= tags
+			return
+		
+		stats.misses += 1
+		
+		for classify in self.classifiers:
+			classify(self, line)
+		
+		cache.set(key, frozenset(line.tag - key[1]))
+	
+	def track(self, line):
+		"""Associate a line of input with the logical line it is part of, prior to classification.
+		
+		Physical lines continuing a logical line are tagged `continuation`, and those continued by the next are tagged
+		`continued`. Lines without a line number (generated code) or already associated with a logical line are
+		left untouched.
+		"""
+		
+		if line.number is None or line.logical is not None:
+			return
+		
+		logical = self.logical
+		
+		if logical is None or not logical.continued:
+			logical = self.logical = LogicalLine()
+		else:
+			line.tag.add('continuation')
+		
+		if logical.append(line):
+			line.tag.add('continued')
+		
+		line.logical = logical
 	
 	def __iter__(self):
 		for line in self.input:
@@ -85,13 +152,42 @@ class Context(object):
 			self.flag.add(value)
 	
 	def pull(self):
-		return self.input.pull()
-	
-	def peek(self):
-		line = self.input.peek()
-		self.classify(line)
+		line = self.input.pull()
+		
+		if line is not None:
+			self.classify(line)
+		
 		return line
 	
+	def peek(self, count=None):
+		"""Retrieve upcoming lines without removing them from the input.
+		
+		Without a count the next line (or None) is returned, otherwise a list of up to `count` lines. Lines are
+		classified in place, so are not classified again once pulled, and should not otherwise be mutated.
+		"""
+		
+		window = list(self.input.window(1 if count is None else count))
+		
+		for line in window:
+			self.classify(line)
+		
+		if count is None:
+			return window[0] if window else None
+		
+		return window
+	
+	def lookahead(self, predicate, limit=None):
+		"""Return the first upcoming line satisfying the predicate, examining at most `limit` lines, or None.
+		
+		As with `peek`, nothing is removed from the input and examined lines are classified in place.
+		"""
+		
+		for line in self.input.window(limit):
+			self.classify(line)
+			
+			if predicate(line):
+				return line
+	
 	def push(self, line):
 		self.classify(line)
 		self.input.push(line)
@@ -139,3 +235,152 @@ class Context(object):
 					line = line.clone(scope=self.input.scope)
 				
 				yield line
+	
+	@property
+	def flat(self):
+		"""Transform input lines and emit output lines using a single loop over an explicit stack of open scopes.
+		
+		Equivalent in result to `stream`, but without the chain of nested generators `stream` builds as scopes nest;
+		every line is handled at the same depth regardless of how deeply the source is nested.
+		
+		Transformers implementing the `enter`, `feed`, and `exit` events are driven directly: `enter` when matched,
+		`feed` for each line (or child output) within their scope, and `exit` when an `_end` line closes it. Any
+		other transformer is adapted by iterating the generator returned by calling it, as `stream` would.
+		"""
+		log.debug("Entering the flat stream.")
+		
+		stack = []
+		
+		for line in self:
+			if '_end' in line.tag:  # Exit the current scope.
+				if not stack:
+					yield line
+					return
+				
+				end = line.number
+				
+				for line in self._emit(stack, (line, )):
+					yield line
+				
+				handler = stack.pop()
+				output = handler.exit(self)
+				
+				if self.recording and self.recording[0] is handler:
+					output = self._retain(end, output)
+				
+				for line in self._emit(stack, output):
+					yield line
+				
+				continue
+			
+			log.debug("Processing " + repr(line) + " with " + repr(self))
+			handler = self.transformer_for(line)
+			
+			if handler is None:
+				log.debug("No handler for line.")
+				
+				for line in self._emit(stack, (line, )):  # Nothing to transform, pass through.
+					yield line
+				
+				continue
+			
+			self.input.push(line)  # Put it back so it can be consumed by the handler.
+			
+			if not hasattr(handler, 'enter'):  # Generator protocol adapter.
+				for line in self._emit(stack, handler(self)):
+					yield line
+				
+				continue
+			
+			if len(stack) == 1 and self.decoder._blocks is not None and getattr(handler, 'incremental', False) and \
+					not self.flag.intersection(getattr(handler, '__positional__', ())):
+				cached = self._recall(handler, line)
+				
+				if cached is not None:  # Splice in the previous translation of this block.
+					for line in self._emit(stack, cached):
+						yield line
+					
+					continue
+			
+			output = handler.enter(self)
+			
+			if self.recording and self.recording[0] is handler:
+				output = self.recording[3] = list(output)
+			
+			for line in self._emit(stack, output):
+				yield line
+			
+			stack.append(handler)
+		
+		while stack:  # Close any scopes left open at the end of input.
+			handler = stack.pop()
+			
+			for line in self._emit(stack, handler.exit(self)):
+				yield line
+	
+	def _recall(self, handler, line):
+		"""Recall the output of an unmodified top-level block from the decoder's block cache, consuming its input.
+		
+		If not cached, prepare to record the block as it is translated. Only called for blocks entered at the top of
+		the module, i.e. with only the module's transformer on the stack; nested blocks are recorded as part of the
+		top-level block containing them. The block is identified by its source and the context flags alone.
+		"""
+		
+		if self.source is None or not line.number:
+			return
+		
+		flags = tuple(sorted(self.flag))
+		cached = self.decoder._blocks.recall(flags, self.source, line.number)
+		
+		if cached is None:
+			module = getattr(self, 'module', None)
+			imports = {k: set(v) for k, v in module._imports.items()} if module else None
+			self.recording = [handler, line.number, flags, (), imports]
+			return
+		
+		count, output, imports = cached
+		self.input.drop(count)
+		self.logical = None  # Blocks always end with a complete logical line.
+		
+		for package, objs in imports:
+			self.module._imports[package].update(objs)
+		
+		return output
+	
+	def _retain(self, end, output):
+		"""Record the output of the top-level block just exited in the decoder's block cache.
+		
+		The block extends to the `_end` line closing it, numbered `end`. Blocks closed by a generated line, lacking a
+		number, are not recorded, nor are blocks left open at the end of input, as their extent is unknown.
+		"""
+		
+		handler, start, flags, prefix, before = self.recording
+		self.recording = None
+		output = list(prefix) + list(output)
+		imports = ()
+		
+		if before is not None:
+			imports = tuple((package, frozenset(objs - before.get(package, set())))
+					for package, objs in sorted(self.module._imports.items()))
+			imports = tuple(i for i in imports if i[1] or i[0] not in before)
+		
+		if end:
+			self.decoder._blocks.record(flags, self.source, start, end, output, imports)
+		
+		return output
+	
+	def _emit(self, stack, lines):
+		"""Deliver lines to the innermost open scope on the stack, yielding any that pass out of the outermost."""
+		
+		for line in lines:
+			if line.scope is None:
+				line = line.clone(scope=self.input.scope)
+			
+			pending = (line, )
+			
+			for handler in reversed(stack):
+				pending = [output for line in pending for output in handler.feed(self, line)]
+				if not pending: break
+			
+			for line in pending:
+				yield line
@@ -2,27 +2,65 @@
 
 from __future__ import unicode_literals
 
-from codecs import register
+from codecs import lookup, register
+from logging import DEBUG
 from pkg_resources import iter_entry_points
 
 from ...package.loader import load
 from ..compat import py2, str
 from ..exc import TranslationError
+from .cache import LRU
 from .context import Context
+from .incremental import BlockCache
+from .memory import Memory
+from .prescan import TAGS, tags
+from .stats import Statistics
 
 
 log = __import__('logging').getLogger(__name__)
 
 
+def qualname(translator):
+	"""The fully qualified name of a translator class."""
+	
+	return translator.__module__ + ':' + getattr(translator, '__qualname__', translator.__name__)
+
+
+def order(translator):
+	"""A stable sort key for translators: by priority, then qualified name."""
+	
+	return (translator.priority, qualname(translator))
+
+
 class GalfiDecoder(object):
 	"""A rich, buffering line transformer.
 	
+	Instances are cached and shared by the Python codec registry, thus may be used by multiple threads at once. All
+	per-translation state is held by the `Context` constructed for each; the caches and statistics shared between
+	translations are thread-safe.
+	
 	Attributes:
 	
 	- The `_name` of the encoding, without flags or options.
 	- A cached `_codec_info` `codecs.CodecInfo` instance.
 	- The names of assigned `_options`.
 	- The entry point `_namespace` to examine for available filters, assignable as the `ns` option.
+	- An optional `_cache` of classification results, sized by the `cache` option.
+	- An optional `_blocks` cache of translated top-level blocks, sized by the `incremental` option.
+	- The `_stats` counters describing work performed, exposed as `stats`.
+	- The distribution `_versions` of translators loaded from entry points, exposed with their names as `versions`.
+	- The `spill` option: the number of lines buffered in memory by block transformers before spilling to disk.
+	- The `optimize` option: the hyphen-separated names of AST optimizer passes to apply to generated functions, or
+		`all`; see `marrow.dsl.tree.optimize`.
+	- The `lazy` option: the number of lines at which top-level functions are compiled on first call, rather than on
+		import; see `marrow.dsl.lazy`.
+	- The `dedupe` option: the number of lines at which identical top-level functions share a single compiled
+		implementation, rather than each compiling their own; see `marrow.dsl.dedupe`.
+	- The `imports` option: `lazy` to emit module imports requested by translators as proxies resolved on first use,
+		supporting only calls and attribute access, or `local` to emit imports requested by a function within that
+		function, rather than eagerly at the top of the module; see `marrow.dsl.lazy`.
+	- The `memory` option: if truthy, e.g. `memory-1`, measure the memory allocated by each stage of translation,
+		reporting the most recent as `stats.memory`; see `marrow.dsl.core.memory`.
 	
 	Encoding names are restricted in the allowable characters (the regular expression `[-\w.]+`) and as such follow
 	a simple serializaiton mechanism:
@@ -31,10 +69,13 @@ class GalfiDecoder(object):
 	2. If flags are present, they are sorted joined together and to the name with periods, e.g. `cinje.raw`.
 	3. If options are present, the keys are sorted and values are joined with hyphens, then joined as per flags, e.g.
 		`cinje.raw.ns-html`.
+	
+	As the codec registry normalizes hyphens to underscores on lookup, either separates an option's key and value.
 	"""
 	
 	# Optional in subclasses: `_flags`, additional named options.
-	__slots__ = ('_name', '_codec_info', '_options', '_namespace', '_translators')
+	__slots__ = ('_name', '_codec_info', '_options', '_namespace', '_translators', '_versions', '_cache', '_blocks',
+			'_stats', 'spill', 'optimize', '_lazy', '_dedupe', 'imports', '_memory')
 	
 	# To allow customization.
 	Context = Context
@@ -48,6 +89,15 @@ class GalfiDecoder(object):
 			))
 		
 		self._name = name
+		self._cache = None
+		self._blocks = None
+		self._stats = Statistics()
+		self.spill = None
+		self.optimize = None
+		self.lazy = None
+		self.dedupe = None
+		self.imports = None
+		self.memory = None
 		self._assign_flags(flags)
 		self._assign_options(options)
 		self._codec_info = self._codec
@@ -55,25 +105,54 @@ class GalfiDecoder(object):
 		# Load the individual translators.
 		# TODO: Conditional requirements...
 		# TODO: Override by name...
-		self._translators = [translator.load() for translator in iter_entry_points(self._namespace)]
+		self._versions = {}
+		self._translators = self._load(self._namespace)
 		
 		# Load translators from the parent namespace, if a child namespace was given.
 		if options['ns']:
-			parent = (translator.load() for translator in iter_entry_points(self._namespace.rpartition('.')[0]))
+			parent = self._load(self._namespace.rpartition('.')[0])
 			parent = (translator for translator in parent if getattr(translator, 'inheritable', True))
 			self._translators = list(parent) + self._translators
 		
-		self._translators.sort(key=lambda handler: handler.priority)
+		self._translators.sort(key=order)  # Ties in priority are broken by name, not entry point discovery order.
 		
 		log.debug("Prepared {0.__class__.__name__} instance for {0} with {n} translators from the {0._namespace} namespace.".format(
 				self,
 				n = len(self._translators)
 			))
 	
+	def _load(self, namespace):
+		"""Load the translators registered within an entry point namespace, noting the version of their distributions."""
+		
+		translators = []
+		
+		for entry in iter_entry_points(namespace):
+			translator = entry.load()
+			translators.append(translator)
+			
+			if entry.dist is not None:
+				self._versions[translator] = entry.dist.project_name + ' ' + entry.dist.version
+		
+		return translators
+	
 	@property
 	def flags(self):
 		return getattr(self, '_flags', set())
 	
+	@property
+	def options(self):
+		"""The name and textual value of each assigned option, sorted by name, as given in the canonical encoding name."""
+		
+		options = ((k, getattr(self, k, None)) for k in self._options)  # Capture options.
+		return [(k, str(v)) for k, v in options if v is not None]  # Reject unset options.
+	
+	@property
+	def versions(self):
+		"""The qualified name and distribution version, if known, of each translator, in the order they are applied."""
+		
+		return [(qualname(translator), self._versions.get(translator) or getattr(translator, '__version__', None))
+				for translator in self._translators]
+	
 	def _assign_flags(self, flags):
 		"""Global processing flags. Subclass and add `_flags` to your `__slots__` to accept flags."""
 		
@@ -113,25 +192,121 @@ class GalfiDecoder(object):
 	def new(cls, declaration):
 		"""Parse a declaration and initialize the decoder instance using extracted name, flags, and options.
 		
-		This allows individual encodings to more easily customize how their names are processed.
+		This allows individual encodings to more easily customize how their names are processed. A part is an option
+		only if its key, preceding the first hyphen or underscore, names an option of this decoder; any other is a flag.
 		"""
 		
 		flags = set()
 		options = {}
 		
 		name, _, parts = declaration.partition('.')
-		parts = parts.split('.')
+		parts = parts.split('.') if parts else ()
 		
 		for part in parts:
-			if '-' in part and part not in cls.FLAGS:
-				k, _, v = part.partition('-')
-				options[k] = v
-				continue
+			if part not in cls.FLAGS and ('-' in part or '_' in part):
+				i = min(i for i in (part.find('-'), part.find('_')) if i >= 0)
+				
+				if cls._option(part[:i]):
+					options[part[:i]] = part[i + 1:]
+					continue
 			
 			flags.add(part)
 		
 		return cls(name, *flags, **options)
 	
+	@classmethod
+	def _option(cls, key):
+		"""Determine if the given key names an option of this decoder: a public slot, or a property with a setter."""
+		
+		if not key or key[0] == '_':
+			return False
+		
+		for base in cls.__mro__:
+			attribute = base.__dict__.get(key)
+			
+			if isinstance(attribute, property):
+				return attribute.fset is not None
+			
+			if key in base.__dict__.get('__slots__', ()):
+				return True
+		
+		return False
+	
+	@property
+	def stats(self):
+		return self._stats
+	
+	@property
+	def cache(self):
+		"""The maximum number of unique line classifications to remember, or None if not caching.
+		
+		Identical lines are common; when enabled, the tags assigned to a line by classifiers are remembered, keyed on
+		the text of the line, including its indentation, its tags prior to classification, and the context flags
+		classifiers declare a dependence upon. Classifiers must only add tags for their results to be safely reusable.
+		
+		Lines forming part of a multi-line logical line, i.e. tagged `continued` or `continuation`, are always
+		classified, as classifiers may examine the logical line as a whole. A size of zero disables the cache.
+		"""
+		
+		return self._cache.size if self._cache is not None else None
+	
+	@cache.setter
+	def cache(self, value):
+		value = int(value or 0)  # Options given within encoding names are strings.
+		self._cache = LRU(value) if value > 0 else None
+	
+	@property
+	def incremental(self):
+		"""The maximum number of translated top-level blocks to remember for re-use, or None if not incremental.
+		
+		Intended for development, where the same source is repeatedly translated after small edits; unmodified
+		top-level blocks, such as functions, are spliced in from the previous translation rather than re-translated.
+		
+		Only blocks entered directly within the module, by transformers declaring themselves `incremental`, and closed
+		by an explicit `_end` line, are remembered; those left open at the end of input are not. A block is identified
+		by its source lines and the context flags on entry alone, thus must translate identically wherever it appears:
+		its output may not depend upon preceding code, other than through flags. Transformers whose output refers to
+		absolute line numbers under certain flags, e.g. `instrument`, name them in `__positional__`, and are not
+		recalled while any is set. A size of zero disables the cache.
+		"""
+		
+		return self._blocks.blocks.size if self._blocks is not None else None
+	
+	@incremental.setter
+	def incremental(self, value):
+		value = int(value or 0)  # Options given within encoding names are strings.
+		self._blocks = BlockCache(value) if value > 0 else None
+	
+	@property
+	def lazy(self):
+		"""The number of lines at which top-level functions are compiled on first call, or None if compiled on import."""
+		
+		return self._lazy
+	
+	@lazy.setter
+	def lazy(self, value):
+		self._lazy = int(value or 0) or None  # Options given within encoding names are strings.
+	
+	@property
+	def dedupe(self):
+		"""The number of lines at which identical top-level functions share their implementation, or None if not shared."""
+		
+		return self._dedupe
+	
+	@dedupe.setter
+	def dedupe(self, value):
+		self._dedupe = int(value or 0) or None  # Options given within encoding names are strings.
+	
+	@property
+	def memory(self):
+		"""Truthy if the memory allocated by each stage of translation is measured, otherwise None."""
+		
+		return self._memory
+	
+	@memory.setter
+	def memory(self, value):
+		self._memory = int(value or 0) or None  # Options given within encoding names are strings.
+	
 	@property
 	def ns(self):
 		return None if self._namespace.count('.') == 2 else self._namespace.rpartition('.')[2]
@@ -147,10 +322,7 @@ class GalfiDecoder(object):
 		"""Form the canonical encoding name for this encoding, with the given flags and options."""
 		
 		parts = [('.' + i) for i in sorted(getattr(self, '_flags', ()))]
-		
-		options = ((k, getattr(self, k, None)) for k in self._options)  # Capture options.
-		options = (i for i in options if i[1] is not None)  # Reject unset options.
-		parts.extend(('.' + k + "-" + str(v)) for k, v in options)  # Render.
+		parts.extend(('.' + k + "-" + v) for k, v in self.options)
 		
 		return self._name + "".join(parts)
 	
@@ -184,14 +356,20 @@ class GalfiDecoder(object):
 					raise UnicodeError("Unsupported value for 'errors': " + errors)
 				
 				super(GalfiIncrementalDecoder, self).__init__(errors)
+				self.chunks = []  # Joined once final, as repeated concatenation would copy the input per chunk.
 			
 			def decode(self, string, final=False):
-				self.buffer += string
+				if string:
+					self.chunks.append(bytes(string))
 				
-				if final:
-					return decoder._decode(self.buffer, errors=self.errors)
-				else:
+				if not final:
 					return ""
+				
+				string, self.chunks = b"".join(self.chunks), []
+				return decoder._decode(string, errors=self.errors)[0]
+			
+			def reset(self):
+				self.chunks = []
 		
 		return CodecInfo(
 				name = str(self),
@@ -215,6 +393,9 @@ class GalfiDecoder(object):
 		if errors != 'strict':
 			raise UnicodeError("Unsupported value for 'errors': " + errors)
 		
+		if not isinstance(string, bytes):  # The import system provides a memoryview.
+			string = bytes(string)
+		
 		try:
 			result = self(string.decode('utf8', errors))
 		
@@ -228,22 +409,85 @@ class GalfiDecoder(object):
 		except Exception as e:
 			raise UnicodeDecodeError(str(self), b"", 0, len(string), str(e))
 		
+		if not result.endswith("\n"):  # The tokenizer requires decoded source to be terminated by a newline.
+			result += "\n"
+		
 		return result, len(string)
 	
 	def __call__(self, input):
-		"""Return input text transformed using plugin transformers.
+		"""Return input text transformed using plugin transformers."""
 		
-		This prepares a context then calls `self.decode(context)` to perform the real work.
+		return self.translate(input)[0]
+	
+	def translate(self, input):
+		"""Return input text transformed using plugin transformers, and the source line number of each output line.
+		
+		This calls `self.transform(input)` to perform the real work, then `self.decode(stream)` to render the result.
+		Generated lines without an originating line number are mapped to None.
 		"""
 		
-		context = self.Context(self, input, self._translators)
+		if self.memory:
+			return self.measure(input)
 		
-		if __debug__:
-			stream = list(context.stream)
+		mapping = []
+		
+		if __debug__ and log.isEnabledFor(DEBUG):
+			stream = self.transform(input)
 			log.debug("Raw Stream:\n\n" + self.decode(stream, True) + "\n")
 			log.debug("Final Code:\n\n" + self.decode(stream, False))
 		
-		return self.decode(stream)
+		else:  # Stream output lines directly into the result, without retaining them.
+			stream = self.iterate(input)
+		
+		def record(stream):
+			for line in stream:
+				mapping.append(line.number)
+				yield line
+		
+		return self.decode(record(stream)), mapping
+	
+	def measure(self, input):
+		"""Translate as per `translate`, measuring the memory allocated by each stage of translation.
+		
+		Output lines are collected prior to rendering, as joining them would regardless. The `Memory` report is
+		assigned to the `memory` attribute of this translation's statistics, thus also to those of the decoder.
+		"""
+		
+		with Memory() as memory:
+			with memory.stage('prepare'):
+				context = self.Context(self, input, self._translators)
+			
+			with memory.classifiers(context), memory.stage('transform'):
+				stream = list(memory.sample(context.flat))
+			
+			with memory.stage('render'):
+				result = self.decode(stream)
+		
+		context.stats.translations += 1
+		context.stats.memory = memory
+		self._stats.merge(context.stats)
+		
+		return result, [line.number for line in stream]
+	
+	def transform(self, input):
+		"""Transform input text, or an iterable of Line instances, into a list of output lines."""
+		
+		return list(self.iterate(input))
+	
+	def iterate(self, input, flags=()):
+		"""Transform input text, or an iterable of Line instances, generating output lines.
+		
+		Additional context `flags` may be given to apply to this translation alone, e.g. `nomap`.
+		"""
+		
+		context = self.Context(self, input, self._translators)
+		context.flag.update(flags)
+		
+		for line in context.flat:
+			yield line
+		
+		context.stats.translations += 1
+		self._stats.merge(context.stats)
 	
 	def decode(self, stream, r=False):
 		"""Galfi decoders implement a streaming line based generation system.
@@ -254,17 +498,126 @@ class GalfiDecoder(object):
 		return "\n".join((repr if r else str)(line) for line in stream)
 
 
+class DecoderChain(GalfiDecoder):
+	"""Apply the transformers of multiple decoders in succession, as stages of a pipeline sharing one line stream.
+	
+	The output lines of each stage are prepared as input lines for the next without rendering the whole to text and
+	splitting it again; their tags are retained. Source line numbers are preserved through each stage, and only the
+	final stage emits a line mapping, thus it refers to the original source.
+	
+	Identified by the `galfi` encoding followed by the encoding of each stage, in order, e.g. `galfi.cinje.mylang`.
+	"""
+	
+	__slots__ = ('_flags', '_stages')
+	
+	FLAGS = frozenset()  # Flags are given to each stage.
+	
+	def __init__(self, *stages):
+		self._stages = stages
+		super(DecoderChain, self).__init__('galfi')
+	
+	def _load(self, namespace):
+		return []  # Each stage loads its own translators.
+	
+	@classmethod
+	def new(cls, declaration):
+		"""Parse a chained declaration, splitting stages where an encoding part names a known DSL.
+		
+		Parts following the name of a stage are the flags and options of that stage.
+		"""
+		
+		groups = []
+		
+		for part in declaration.split('.')[1:]:
+			try:
+				Decoder = load(part, 'marrow.dsl')
+			except LookupError:  # Not the name of a DSL; a flag or option of the preceding stage.
+				Decoder = None
+			
+			if Decoder:
+				groups.append((Decoder, [part]))
+				continue
+			
+			if not groups:
+				raise LookupError("Chained galfi encoding must begin with a DSL name: " + declaration)
+			
+			groups[-1][1].append(part)
+		
+		if not groups:
+			raise LookupError("Chained galfi encoding must name at least one DSL: " + declaration)
+		
+		return cls(*(Decoder.new('.'.join(parts)) for Decoder, parts in groups))
+	
+	@property
+	def versions(self):
+		return [version for stage in self._stages for version in stage.versions]
+	
+	def __str__(self):
+		return self._name + ''.join(('.' + str(stage)) for stage in self._stages)
+	
+	if py2:
+		__unicode__ = __str__
+		del __str__
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({1})'.format(self, ', '.join(repr(str(stage)) for stage in self._stages))
+	
+	@staticmethod
+	def restage(line):
+		"""Prepare a line of output from one stage as a line of input to the next, retaining its public tags.
+		
+		The base tags, e.g. `blank`, are those of the output text, as a pre-scan of it would assign. The line is no
+		longer marked classified, so that the classifiers of the next stage examine it.
+		"""
+		
+		text = str(line)
+		restaged = line.clone(line=text, scope=None, logical=None)
+		restaged.tag -= TAGS[-1]  # Every base tag.
+		restaged.tag.discard('classified')
+		restaged.tag |= tags(text)
+		
+		return restaged
+	
+	def iterate(self, input, flags=()):
+		stream = input
+		final = len(self._stages) - 1
+		
+		for i, stage in enumerate(self._stages):
+			if i:
+				stream = (self.restage(line) for line in stream)
+			
+			stream = stage.iterate(stream, flags if i == final else tuple(flags) + ('nomap', ))
+		
+		for line in stream:
+			yield line
+		
+		with self._stats.lock:
+			self._stats.translations += 1
+
+
 def galfi(name):
-	"""Look up an encoding name for processing via galfi DSL."""
+	"""Look up an encoding name for processing via galfi DSL.
 	
-	log.debug("Galfi asked about " + repr(name) + " encoding.")
+	The literal `galfi` encoding chains other encodings together, e.g. `galfi.cinje.mylang`.
+	"""
 	
-	# TODO: Special case the literla "galfi" encoding to support decoder chaining.
+	log.debug("Galfi asked about " + repr(name) + " encoding.")
 	
 	short, _, _ = name.partition('.')
-	Decoder = load(short, 'marrow.dsl', default=None)
 	
-	if not Decoder:
+	if short == 'galfi':
+		try:
+			decoder = DecoderChain.new(name)
+		except LookupError as e:
+			log.warning(str(e))
+			return None
+		
+		log.debug("Instantiated galfi decoder chain: " + repr(decoder))
+		return decoder._codec_info
+	
+	try:
+		Decoder = load(short, 'marrow.dsl')
+	except LookupError:  # Not a DSL; allow codec search functions registered later to be consulted.
 		return None
 	
 	decoder = Decoder.new(name)
@@ -272,4 +625,19 @@ def galfi(name):
 	
 	return decoder._codec_info
 
+def decoder(name):
+	"""Retrieve the galfi decoder instance registered for the given encoding name, or None if not a galfi encoding.
+	
+	Decoders are cached by the Python codec registry, so this reuses any instance already constructed for imports.
+	"""
+	
+	try:
+		decode = lookup(name).decode
+	except LookupError:
+		return None
+	
+	instance = getattr(decode, '__self__', None)
+	return instance if isinstance(instance, GalfiDecoder) else None
+
+
 register(galfi)
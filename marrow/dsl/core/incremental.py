@@ -0,0 +1,76 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from hashlib import sha1
+from threading import Lock
+
+from .cache import LRU
+
+
+class BlockCache(object):
+	"""The translated output of top-level blocks, for splicing into later translations of edited sources.
+	
+	Blocks are identified by a digest of their physical source lines and the context flags at the time they were
+	entered. Because the extent of a block is not known until translated, the lengths of previously translated blocks
+	are indexed by their first line; a block is only recalled if the same number of upcoming lines hash identically.
+	
+	Blocks must be self-contained: beyond the output lines themselves, only the imports a block requests of the module
+	are replayed when recalled.
+	
+	Attributes:
+	
+	- `blocks`: Map block digest to the starting line number, output lines, and imports of the block.
+	- `extents`: Map the flags and first line of source to the set of block lengths beginning with it.
+	- `lock`: Serializes updates to the sets of block lengths.
+	"""
+	
+	__slots__ = ('blocks', 'extents', 'lock')
+	
+	def __init__(self, size):
+		self.blocks = LRU(size)
+		self.extents = LRU(size)
+		self.lock = Lock()
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({1}/{2})'.format(self, len(self.blocks), self.blocks.size)
+	
+	def __len__(self):
+		return len(self.blocks)
+	
+	@staticmethod
+	def digest(flags, lines):
+		return sha1(('\n'.join(flags) + '\0' + '\n'.join(lines)).encode('utf8')).hexdigest()
+	
+	def recall(self, flags, source, start):
+		"""Find a block beginning on the given line number of the source lines.
+		
+		Returns the number of physical lines comprising the block, its output lines renumbered to match the block's
+		new position, and its imports, or None if there is no match.
+		"""
+		
+		offset = start - 1
+		
+		for count in sorted(self.extents.get((flags, source[offset]), ())):
+			entry = self.blocks.get(self.digest(flags, source[offset:offset + count]))
+			
+			if entry is None:
+				continue
+			
+			origin, output, imports = entry
+			delta = start - origin
+			output = [line.clone(number=line.number + delta if line.number else line.number) for line in output]
+			
+			return count, output, imports
+	
+	def record(self, flags, source, start, end, output, imports):
+		"""Remember the output and imports of the block spanning the given (inclusive) line numbers."""
+		
+		key = (flags, source[start - 1])
+		
+		with self.lock:
+			extents = self.extents.get(key) or frozenset()
+			self.extents.set(key, extents | {end - start + 1})
+		
+		output = tuple(line.clone() for line in output)
+		self.blocks.set(self.digest(flags, source[start - 1:end]), (start, output, imports))
@@ -7,6 +7,7 @@ from .lines import Lines
 
 class Classifier(object):
 	__slots__ = ()
+	__depends__ = ()  # Context flags classification depends upon, for the purpose of caching results.
 	
 	priority = 0
 	
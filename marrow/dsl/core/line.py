@@ -2,7 +2,7 @@
 
 from __future__ import unicode_literals
 
-from .compat import py2, str
+from ..compat import py2, str
 
 
 class Line(object):
@@ -15,20 +15,19 @@ class Line(object):
 	- `number`: The originating line number.
 	- `scope`: The scope (generally indentation level) of the line.
 	- `tag`: An optional set of tags to associate with the line.
+	- `logical`: The LogicalLine this line is a physical part of, if tracked.
 	"""
 	
-	__slots__ = ('line', 'stripped', 'number', 'scope', 'tag')
+	__slots__ = ('line', 'stripped', 'number', 'scope', 'tag', 'logical')
 	
-	def __init__(self, line, number=None, scope=None, tags=None):
+	def __init__(self, line, number=None, scope=None, tags=None, logical=None):
 		self.line = line
 		line = self.stripped = line.strip()
 		
 		self.number = number
 		self.scope = scope
 		self.tag = set(tags) if tags else set()
-		
-		if line.endswith('\\') and not line.endswith('\\\\'):
-			self.tag.add('continued')
+		self.logical = logical
 		
 		super(Line, self).__init__()
 	
@@ -56,13 +55,13 @@ class Line(object):
 				number = kw.get('number', self.number),
 				scope = kw.get('scope', self.scope),
 				tags = kw['tags'] if 'tags' in kw else set(i for i in self.tag if i[0] != '_'),
+				logical = kw.get('logical', self.logical),
 			)
 	
 	def format(self, *args, **kw):
-		"""Perform str.format string interpolation on the line."""
+		"""Perform str.format string interpolation on the line, returning a new line as per `clone`."""
 		
 		if '{' not in self.line:
 			raise ValueError("Not a template line: " + repr(self))
-			return self
 		
 		return self.clone(line=self.line.format(*args, **kw))
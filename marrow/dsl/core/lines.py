@@ -5,7 +5,7 @@ from __future__ import unicode_literals
 from collections import deque
 
 from .buffer import Buffer
-from .compat import py2, str
+from ..compat import py2, str
 from .line import Line
 
 
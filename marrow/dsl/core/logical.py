@@ -0,0 +1,122 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import re
+
+
+class LogicalLine(object):
+	"""A logical line of source, assembled incrementally from one or more physical lines.
+	
+	String literal and bracket nesting state is carried from physical line to physical line, so each line is scanned
+	exactly once, as it is appended. A logical line continues past a physical line ending within an open bracket, an
+	open triple-quoted string, or after a trailing backslash outside of a string.
+	
+	Attributes:
+	
+	- `lines`: The physical Line instances comprising this logical line, in order.
+	- `quote`: The quotes of a string literal left open by the last physical line, if any.
+	- `depth`: The number of brackets left open by the last physical line.
+	- `continued`: True if the logical line continues past the last physical line.
+	"""
+	
+	__slots__ = ('lines', 'quote', 'depth', 'continued')
+	
+	CODE = re.compile(r'''[#'"()\[\]{}]''')  # Characters affecting state outside of string literals.
+	BRACKETS = {'(': 1, '[': 1, '{': 1, ')': -1, ']': -1, '}': -1}
+	
+	def __init__(self):
+		self.lines = []
+		self.quote = None
+		self.depth = 0
+		self.continued = False
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({0.span}, depth={0.depth}, quote={0.quote!r}, "{0.text}")'.format(self)
+	
+	@property
+	def complete(self):
+		"""Has the final physical line of this logical line been appended?"""
+		
+		return bool(self.lines) and not self.continued
+	
+	@property
+	def span(self):
+		"""The range of physical line numbers, inclusive, this logical line was assembled from."""
+		
+		if not self.lines:
+			return (None, None)
+		
+		return (self.lines[0].number, self.lines[-1].number)
+	
+	@property
+	def text(self):
+		"""The assembled logical line: whitespace stripped physical lines joined by single spaces.
+		
+		Continuation backslashes are removed. Useful for inspection, e.g. of multi-line declarations, rather than for
+		the regeneration of code.
+		"""
+		
+		parts = [line.stripped for line in self.lines]
+		
+		for i, text in enumerate(parts[:-1]):
+			if text.endswith('\\') and not text.endswith('\\\\'):
+				parts[i] = text[:-1].rstrip()
+		
+		return ' '.join(parts)
+	
+	def append(self, line):
+		"""Scan the next physical line, updating state, and return True if the logical line continues past it."""
+		
+		text = line.line
+		quote = self.quote
+		depth = self.depth
+		brackets = self.BRACKETS
+		search = self.CODE.search
+		escaped = False  # Trailing backslash outside of a string literal?
+		i = 0
+		
+		while True:
+			if quote:  # Locate the end of the open string literal, skipping escapes.
+				end = text.find(quote, i)
+				slash = text.find('\\', i, end if end >= 0 else len(text))
+				
+				if slash >= 0:
+					i = slash + 2
+					continue
+				
+				if end < 0:
+					break
+				
+				i = end + len(quote)
+				quote = None
+				continue
+			
+			match = search(text, i)
+			
+			if not match:
+				escaped = text.rstrip().endswith('\\')
+				break
+			
+			char = match.group()
+			i = match.end()
+			
+			if char == '#':  # The remainder is a comment.
+				break
+			
+			if char in brackets:
+				depth = max(depth + brackets[char], 0)
+				continue
+			
+			quote = char * 3 if text.startswith(char * 3, i - 1) else char
+			i += len(quote) - 1
+		
+		if quote and len(quote) == 1 and not text.rstrip().endswith('\\'):
+			quote = None  # Single-quoted strings may only continue through an escaped newline.
+		
+		self.lines.append(line)
+		self.quote = quote
+		self.depth = depth
+		self.continued = bool(quote or depth or escaped)
+		
+		return self.continued
@@ -0,0 +1,251 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import gc
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+from threading import Lock
+
+from .line import Line
+
+
+class Stage(namedtuple('Stage', ('name', 'peak', 'retained'))):
+	"""The memory allocated by one stage of a translation.
+	
+	- `name`: The name of the stage.
+	- `peak`: The greatest number of bytes allocated at any point during the stage, beyond those allocated on entry.
+	- `retained`: The number of bytes allocated during the stage still allocated at its end; may be negative.
+	"""
+	
+	__slots__ = ()
+	
+	def __str__(self):
+		return "{0.name:<10} {1:>12.1f} KiB peak {2:>12.1f} KiB retained".format(self, self.peak / 1024.0,
+				self.retained / 1024.0)
+
+
+class Tracing(object):
+	"""The process-wide tracing shared by measurements in progress, begun by the first and ended after the last.
+	
+	While tracing, the construction and finalization of `Line` instances are counted by hooks installed upon the class,
+	giving the net change in the number of live lines since tracing began; these are removed once tracing ends, thus
+	translations not measured bear no cost. `tracemalloc` is started and stopped alongside, unless already tracing.
+	
+	Attributes:
+	
+	- `lock`: Serializes beginning and ending tracing.
+	- `users`: The number of measurements in progress.
+	- `lines`: The net number of lines constructed, less those finalized, while tracing.
+	"""
+	
+	__slots__ = ('lock', 'users', 'lines', '_started', '_init')
+	
+	def __init__(self):
+		self.lock = Lock()
+		self.users = 0
+		self.lines = 0
+		self._started = False
+		self._init = None
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}(users={0.users}, lines={0.lines})'.format(self)
+	
+	def acquire(self):
+		with self.lock:
+			if not self.users:
+				self._started = not tracemalloc.is_tracing()
+				
+				if self._started:
+					tracemalloc.start()
+				
+				self._hook()
+			
+			self.users += 1
+	
+	def release(self):
+		with self.lock:
+			self.users -= 1
+			
+			if self.users:
+				return
+			
+			self._unhook()
+			
+			if self._started:
+				tracemalloc.stop()
+				self._started = False
+	
+	def _hook(self):
+		init = self._init = Line.__init__
+		
+		def __init__(instance, *args, **kw):
+			self.lines += 1
+			init(instance, *args, **kw)
+		
+		def __del__(instance):
+			self.lines -= 1
+		
+		Line.__init__ = __init__
+		Line.__del__ = __del__
+	
+	def _unhook(self):
+		Line.__init__ = self._init
+		del Line.__del__
+		self._init = None
+
+
+tracing = Tracing()
+
+
+class Memory(object):
+	"""A report of the memory allocated by each stage of a single translation, measured using `tracemalloc`.
+	
+	The stages, in order, are:
+	
+	- `prepare`: Pre-scanning and splitting the source, constructing its `Line` instances and the input `Buffer`.
+	- `transform`: Classifying and transforming input lines, including block buffering, collecting the output lines.
+	- `classify`: The portion of `transform` spent within classifiers, included in its figures.
+	- `render`: Joining the output lines into the resulting text.
+	
+	Attributes:
+	
+	- `stages`: The `Stage` records of each stage measured, in order.
+	- `peak`: The greatest number of bytes allocated at any point during translation, beyond those allocated prior.
+	- `lines`: The growth in the number of live `Line` instances at the greatest allocation observed.
+	
+	Live lines are counted between output lines and at stage boundaries; the count is thus that at the greatest of these
+	samples, an approximation of that at the true peak.
+	
+	Requires Python 3.9 or newer. Tracing is shared by measurements in progress; see `Tracing`. If `tracemalloc` is
+	already tracing it is left running.
+	
+	Peak tracking is, however, process-wide: measurements made concurrently, e.g. of translations within multiple
+	threads, reset each other's peak, and include each other's allocations and lines. Their figures are unreliable;
+	measure one translation at a time.
+	"""
+	
+	__slots__ = ('stages', 'peak', 'lines', '_base', '_lines', '_high', '_sampled', '_classify')
+	
+	def __init__(self):
+		self.stages = []
+		self.peak = 0
+		self.lines = 0
+		self._base = 0
+		self._lines = 0
+		self._high = 0  # The greatest allocation observed prior to the last reset of peak tracking.
+		self._sampled = 0
+		self._classify = [0, 0]  # Greatest and retained bytes allocated by classifiers.
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}(peak={0.peak}, lines={0.lines}, stages={1})'.format(self,
+				', '.join(stage.name for stage in self.stages))
+	
+	def __str__(self):
+		return "\n".join(self.report())
+	
+	def __getitem__(self, name):
+		for stage in self.stages:
+			if stage.name == name:
+				return stage
+		
+		raise KeyError(name)
+	
+	def __enter__(self):
+		if not hasattr(tracemalloc, 'reset_peak'):
+			raise RuntimeError("Memory accounting requires Python 3.9 or newer.")
+		
+		tracing.acquire()
+		gc.collect()  # Lest garbage, e.g. lines of earlier translations, be released during, and counted against, this.
+		tracemalloc.reset_peak()
+		self._base = tracemalloc.get_traced_memory()[0]
+		self._lines = tracing.lines
+		
+		return self
+	
+	def __exit__(self, type, value, traceback):
+		try:
+			self.count()
+		finally:
+			tracing.release()
+	
+	def report(self):
+		"""Produce a textual summary of the report."""
+		
+		yield "Translation allocated {:.1f} KiB at peak, with {} lines alive.".format(self.peak / 1024.0, self.lines)
+		
+		for stage in self.stages:
+			yield str(stage)
+	
+	@contextmanager
+	def stage(self, name):
+		"""Measure the memory allocated within the body of the `with` statement as a named stage."""
+		
+		start = self._high = tracemalloc.get_traced_memory()[0]
+		tracemalloc.reset_peak()
+		
+		try:
+			yield
+		
+		finally:
+			current, peak = tracemalloc.get_traced_memory()
+			peak = max(peak, self._high)
+			self.stages.append(Stage(name, peak - start, current - start))
+			self.peak = max(self.peak, peak - self._base)
+			self.count()
+	
+	def count(self):
+		"""Count the live `Line` instances, retaining the count if allocation is at its greatest observed."""
+		
+		current = tracemalloc.get_traced_memory()[0] - self._base
+		
+		if current < self._sampled:
+			return
+		
+		self._sampled = current
+		self.lines = tracing.lines - self._lines
+	
+	def sample(self, lines):
+		"""Pass through an iterable of lines, counting those alive as allocation grows."""
+		
+		for line in lines:
+			self.count()
+			yield line
+	
+	def classifier(self, classify):
+		"""Wrap a classifier, accumulating the memory allocated within it as the `classify` stage.
+		
+		Peak tracking is reset on entry to each call, thus the greatest allocation prior to it is retained first.
+		"""
+		
+		totals = self._classify
+		
+		def classifier(context, line):
+			start, peak = tracemalloc.get_traced_memory()
+			self._high = max(self._high, peak)
+			tracemalloc.reset_peak()
+			
+			try:
+				classify(context, line)
+			
+			finally:
+				current, peak = tracemalloc.get_traced_memory()
+				totals[0] = max(totals[0], peak - start)
+				totals[1] += current - start
+		
+		return classifier
+	
+	@contextmanager
+	def classifiers(self, context):
+		"""Measure the classifiers of a context while within the body of the `with` statement."""
+		
+		original = context.classifiers
+		context.classifiers = [self.classifier(classify) for classify in original]
+		
+		try:
+			yield
+		
+		finally:
+			context.classifiers = original
+			self.stages.append(Stage('classify', *self._classify))
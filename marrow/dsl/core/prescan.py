@@ -0,0 +1,114 @@
+# encoding: utf-8
+
+"""Whole-input structural pre-scanning.
+
+Basic structural facts about every line of input are computed in bulk, prior to iteration by the context, rather
+than through per-line branching. NumPy is used to vectorize the scan if available.
+
+Whitespace is as understood by `str.strip`, including that beyond ASCII, thus lines are blank exactly when their
+`Line.stripped` text is empty, whichever implementation is used.
+"""
+
+from __future__ import unicode_literals
+
+import re
+from collections import namedtuple
+
+try:
+	import numpy
+except ImportError:  # pragma: no cover
+	numpy = None
+else:  # The code points of every whitespace character, the greatest being U+3000.
+	WHITESPACE = numpy.array([i for i, char in enumerate(numpy.arange(0x3001, dtype=numpy.uint32).tobytes()
+			.decode('utf-32-le')) if char.isspace()], dtype=numpy.uint32)
+
+
+BLANK, COMMENT, CONTINUED = 1, 2, 4  # Bit flags comprising the `kind` of each line.
+
+# The base tags assigned to lines of each kind; blank lines can be neither comments nor continued.
+TAGS = tuple(frozenset(tag for bit, tag in ((BLANK, 'blank'), (COMMENT, 'comment'), (CONTINUED, 'continued'))
+		if kind & bit) for kind in range(8))
+
+# Leading whitespace, the first character of content, and the trailing characters of content, per line.
+STRUCTURE = re.compile(r'^([^\S\n]*)(?:(?=(\S)).*?(\\\\|\\)?)?[^\S\n]*$', re.M | re.U)
+
+
+class Prescan(namedtuple('Prescan', ('indent', 'kind'))):
+	"""The structure of each line of input, as columns indexed by line number less one.
+	
+	- `indent`: The number of leading whitespace characters.
+	- `kind`: A combination of the `BLANK`, `COMMENT`, and `CONTINUED` bit flags.
+	"""
+	
+	__slots__ = ()
+	
+	def tags(self, index):
+		"""The base tags for the line at the given index."""
+		
+		return TAGS[self.kind[index]]
+
+
+def prescan(text):
+	"""Scan the structure of every newline-separated line of the given text in one pass."""
+	
+	if numpy is not None and text:
+		return _vectorized(text)
+	
+	indent = []
+	kind = []
+	
+	for match in STRUCTURE.finditer(text):
+		indent.append(len(match.group(1)))
+		kind.append(_kind(match))
+	
+	return Prescan(indent, kind)
+
+
+def tags(line):
+	"""The base tags for a single line of text, as assigned to lines by a pre-scan."""
+	
+	return TAGS[_kind(STRUCTURE.match(line))]
+
+
+def _kind(match):
+	leading, first, trailing = match.groups()
+	
+	if not first:
+		return BLANK
+	
+	return (COMMENT if first == '#' else 0) | (CONTINUED if trailing == '\\' else 0)
+
+
+def _vectorized(text):
+	"""NumPy implementation of `prescan`, operating on code points."""
+	
+	points = numpy.frombuffer(text.encode('utf-32-le'), dtype=numpy.uint32)
+	newline = numpy.flatnonzero(points == 10)
+	
+	start = numpy.concatenate(([0], newline + 1))  # First index of each line.
+	end = numpy.concatenate((newline, [len(points)]))  # Index just past each line.
+	count = len(start)
+	
+	content = numpy.flatnonzero(~numpy.isin(points, WHITESPACE))
+	
+	if not len(content):  # Entirely whitespace.
+		return Prescan((end - start).tolist(), [BLANK] * count)
+	
+	owner = numpy.searchsorted(start, content, 'right') - 1  # The line each non-whitespace character belongs to.
+	
+	present, first = numpy.unique(owner, return_index=True)
+	last = numpy.concatenate((first[1:], [len(owner)])) - 1
+	first, last = content[first], content[last]  # Indexes of the first and last content characters per line.
+	
+	kind = numpy.full(count, BLANK, dtype=numpy.uint8)
+	kind[present] = 0
+	kind[present[points[first] == 35]] |= COMMENT  # "#"
+	
+	slash = points[last] == 92  # "\"
+	doubled = slash & (last > first) & (points[last - 1] == 92)
+	kind[present[slash & ~doubled]] |= CONTINUED
+	
+	indent = end - start
+	indent[present] = first - start[present]
+	
+	return Prescan(indent.tolist(), kind.tolist())
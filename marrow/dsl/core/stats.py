@@ -0,0 +1,55 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from threading import Lock
+
+
+class Statistics(object):
+	"""Counters describing the work performed by a decoder.
+	
+	Attributes:
+	
+	- `translations`: The number of sources translated.
+	- `lines`: The number of lines of input classified.
+	- `hits`: The number of lines classified using cached results.
+	- `misses`: The number of lines classified by invoking classifiers while caching.
+	- `memory`: The `Memory` report of the most recent translation measured, if the decoder's `memory` option is set.
+	
+	Each translation accumulates its own counters, merged into those of the decoder once complete.
+	"""
+	
+	__slots__ = ('translations', 'lines', 'hits', 'misses', 'memory', 'lock')
+	
+	def __init__(self):
+		self.lock = Lock()
+		self.reset()
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}(translations={0.translations}, lines={0.lines}, hit_rate={0.hit_rate:.2%})'.format(self)
+	
+	@property
+	def hit_rate(self):
+		"""The fraction of cacheable classifications satisfied by the classification cache."""
+		
+		total = self.hits + self.misses
+		return (self.hits / float(total)) if total else 0.0
+	
+	def merge(self, other):
+		"""Accumulate the counters of another, e.g. per-translation, statistics instance."""
+		
+		with self.lock:
+			self.translations += other.translations
+			self.lines += other.lines
+			self.hits += other.hits
+			self.misses += other.misses
+			
+			if other.memory is not None:
+				self.memory = other.memory
+	
+	def reset(self):
+		self.translations = 0
+		self.lines = 0
+		self.hits = 0
+		self.misses = 0
+		self.memory = None
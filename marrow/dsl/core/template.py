@@ -0,0 +1,48 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+
+class Template(object):
+	"""A line of code generation template, rendered into new lines using `str.format` interpolation.
+	
+	Declare templates once, e.g. as class attributes of a transformer, and render them relative to the line that
+	triggered generation:
+		
+		IMPORT = Template('from {} import {}')
+		
+		yield self.IMPORT.render(line, package, name)
+	
+	The rendered line inherits the number, scope, public (not underscore-prefixed) tags, and logical line of the
+	triggering line, as a clone would, without first cloning it. The format string is parsed by `str.format` itself,
+	in C, on each call; a template retains only the bound method.
+	
+	Attributes:
+	
+	- `text`: The template text.
+	"""
+	
+	__slots__ = ('text', '_format')
+	
+	def __init__(self, text):
+		self.text = text
+		self._format = text.format
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({0.text!r})'.format(self)
+	
+	def __call__(self, *args, **kw):
+		"""Interpolate the template, returning text."""
+		
+		return self._format(*args, **kw)
+	
+	def render(self, line, *args, **kw):
+		"""Interpolate the template into a new line, of the same class as, and inheriting the attributes of, another."""
+		
+		return line.__class__(
+				self._format(*args, **kw),
+				line.number,
+				line.scope,
+				{i for i in line.tag if i[0] != '_'},
+				line.logical,
+			)
@@ -2,39 +2,76 @@
 
 from __future__ import unicode_literals
 
-from base64 import b64encode
-from zlib import compress
+from base64 import b64decode, b64encode
+from struct import Struct
+from zlib import compress, decompress
+
+
+LONG = Struct('>I')
 
 
 def redelta_encode(numbers):
 	"""Encode a series of line numbers as the difference from line to line (deltas) to reduce entropy.
 	
-	The delta is stored as a single signed byte per line, meaning no two consecutive lines may vary by more than +/-
-	127 lines within the original source material. The resulting bytestring is then zlib compressed and b64 encoded.
+	The delta is stored as a single signed byte per line. Where two consecutive lines vary by more than +/- 127 lines
+	within the original source material the byte 255 is stored, followed by the absolute line number as a four byte,
+	big-endian, unsigned integer. The resulting bytestring is then zlib compressed and b64 encoded.
 	
 	Lines without line numbers (none or unexpected zeros) will inherit the last known line number after decoding.
 	"""
 	
 	def inner():
-		lines = iter(numbers)
-		prev = next(lines)
+		prev = 0
 		
-		for line in lines:
-			delta = (line or prev) - prev  # Handle the "no line number given" case.
-			if delta < 0: delta = -1 * delta + 127  # Store "signed" values.
-			prev = (line or prev)  # Track our line number, or the last known good one.
-			yield delta  # Store the delta.
+		for line in numbers:
+			line = line or prev  # Handle the "no line number given" case.
+			delta = line - prev
+			prev = line  # Track our line number, or the last known good one.
+			
+			if -127 <= delta <= 127:
+				yield delta if delta >= 0 else 127 - delta  # Store "signed" values.
+				continue
+			
+			yield 255  # Too distant; store the absolute line number.
+			
+			for byte in bytearray(LONG.pack(line)):
+				yield byte
 	
 	return b64encode(compress(bytes(bytearray(inner())))).decode('latin1')
 
 
+def deflate(text):
+	"""Compress text, e.g. source code to embed within generated code, returning it zlib compressed and b64 encoded."""
+	
+	return b64encode(compress(text.encode('utf8'))).decode('latin1')
+
+
 def redelta_decode(source):
 	"""Decode a series of line numbers encoded as the difference from line to line.
 	
-	The literal reverse of `redelta_encode`.
+	The literal reverse of `redelta_encode`, accepting the encoded text or bytes, returning a list of line numbers.
 	"""
 	
-	pass
+	data = bytearray(decompress(b64decode(source)))
+	numbers = []
+	prev = 0
+	i = 0
+	
+	while i < len(data):
+		delta = data[i]
+		i += 1
+		
+		if delta == 255:
+			prev, = LONG.unpack(bytes(data[i:i + 4]))
+			i += 4
+		elif delta > 127:
+			prev -= delta - 127
+		else:
+			prev += delta
+		
+		numbers.append(prev)
+	
+	return numbers
 
 
 def chunk(line, mapping={None: 'text', '${': 'escape', '#{': 'bless', '&{': 'args', '%{': 'format', '@{': 'json'}):
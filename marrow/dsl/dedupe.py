@@ -0,0 +1,99 @@
+# encoding: utf-8
+
+"""Runtime support for sharing the implementation of identical generated functions between modules.
+
+When the `dedupe` option is given, e.g. `cinje.dedupe-10`, each top-level function of at least that many lines is
+emitted as a stub, identified by a digest of its translated source, which is stored compressed:
+
+	@decorator
+	@__dedupe__('3f786850e387550fdab836ed7e6dc881de23001b', b"eJx...")
+	def render(items, sep=None):
+		\"\"\"Documentation is retained.\"\"\"
+		pass
+
+On definition, the code of the stub is replaced by that of the real function. The real function is compiled only by
+the first stub with a given digest; every other module defining an identical function shares its code object, held
+within a process-wide table for as long as any function uses it. Decorators, defaults, and the module globals the
+function executes within remain those of each module.
+
+Tracebacks within shared code refer to the file `<marrow.dsl.dedupe:digest>`, and its line numbers to the function
+as translated, beginning with its declaration, rather than to any one module.
+"""
+
+from __future__ import unicode_literals
+
+from base64 import b64decode
+from threading import Lock
+from types import CodeType
+from weakref import WeakValueDictionary
+from zlib import decompress
+
+
+log = __import__('logging').getLogger(__name__)
+
+
+class Dedupe(object):
+	"""Runtime support referenced by generated code as `__dedupe__`.
+	
+	Attributes:
+	
+	- `table`: Map the digest of the translated source of each function to its shared code object.
+	- `lock`: Serializes the compilation of shared code.
+	- `hits`: The number of stubs given existing shared code.
+	- `misses`: The number of stubs whose shared code was compiled.
+	"""
+	
+	__slots__ = ('table', 'lock', 'hits', 'misses')
+	
+	def __init__(self):
+		self.table = WeakValueDictionary()
+		self.lock = Lock()
+		self.hits = 0
+		self.misses = 0
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}(functions={1}, hits={0.hits}, misses={0.misses})'.format(self, len(self.table))
+	
+	def __call__(self, digest, payload):
+		"""Decorate a stub function, replacing its code with the shared code identified by the digest."""
+		
+		def decorator(fn):
+			fn.__code__ = self.code(digest, payload, fn.__code__.co_name)
+			return fn
+		
+		return decorator
+	
+	def code(self, digest, payload, name):
+		"""Retrieve the shared code object of the named function, compiling it from its compressed source if absent."""
+		
+		code = self.table.get(digest)
+		
+		if code is not None:
+			self.hits += 1
+			return code
+		
+		with self.lock:
+			code = self.table.get(digest)
+			
+			if code is None:
+				code = self.table[digest] = self._compile(digest, payload, name)
+				self.misses += 1
+		
+		return code
+	
+	def _compile(self, digest, payload, name):
+		source = decompress(b64decode(payload)).decode('utf8')
+		
+		if __debug__:
+			log.debug("Compiling shared function " + name + " identified by " + digest)
+		
+		module = compile(source, '<marrow.dsl.dedupe:' + digest + '>', 'exec')
+		
+		for constant in module.co_consts:
+			if isinstance(constant, CodeType) and constant.co_name == name:
+				return constant
+		
+		raise RuntimeError("Shared source of " + name + " does not declare it.")
+
+
+__dedupe__ = Dedupe()  # The process-wide table of shared function code referenced by generated code.
@@ -0,0 +1,180 @@
+# encoding: utf-8
+
+"""Runtime support for lazily compiled function bodies and lazily resolved imports.
+
+When the `lazy` option is given, e.g. `cinje.lazy-100`, the translated source of each top-level function of at least
+that many lines is compressed and stored within a decorator applied to a small stub function:
+
+	@decorator
+	@__lazy__.stub(b"eJx...")
+	def render(items, sep=None):
+		\"\"\"Documentation is retained.\"\"\"
+		return __lazy__(locals())
+
+On first call the stub decompresses and compiles the real function, replaces its own code with that of the real
+function, then calls itself again with the arguments it was given. The stub is padded with blank lines so that the
+real function's line numbers match those of the generated module as they would be were the function not deferred.
+
+The stub decorator is applied first, directly to the stub, so that other decorators, including those wrapping the
+function, receive the registered stub.
+
+When the `imports-lazy` option is given, module-level imports requested by translators, other than those of
+`__future__` or using `*`, are emitted as proxies resolving the imported object on first use:
+
+	__lazy__.imports(globals(), 'package.module', 'name', 'other as alias')
+
+Imports written within the DSL source itself are emitted as written. A proxy replaces itself within the module's
+namespace once resolved, thus later lookups find the real object. Until then, only calling it and accessing its
+attributes are supported; a proxy is not the object it stands for. It must not be used with `isinstance` or `is`, in
+an `except` clause, or as a base class, and references to it captured prior to its resolution, e.g. as the default
+value of an argument, remain the proxy. Translators should only request imports of objects they call, or whose
+attributes they access.
+
+Requires Python 3.3 or newer.
+"""
+
+from __future__ import unicode_literals
+
+import sys
+from base64 import b64decode
+from importlib import import_module
+from inspect import BoundArguments, signature
+from threading import Lock
+from types import CodeType
+from weakref import WeakValueDictionary
+from zlib import decompress
+
+
+log = __import__('logging').getLogger(__name__)
+
+
+class Import(object):
+	"""A proxy for a lazily imported object, bound within a module namespace.
+	
+	Attributes:
+	
+	- `namespace`: The module namespace (globals) the proxy is assigned within.
+	- `package`: The dotted path of the module to import from.
+	- `name`: The name of the object, or submodule, to import.
+	- `alias`: The name the object is assigned to within the namespace.
+	"""
+	
+	__slots__ = ('namespace', 'package', 'name', 'alias')
+	
+	def __init__(self, namespace, package, name, alias=None):
+		self.namespace = namespace
+		self.package = package
+		self.name = name
+		self.alias = alias or name
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({0.package!r}, {0.name!r}, alias={0.alias!r})'.format(self)
+	
+	def resolve(self):
+		"""Import the object, replacing this proxy with it in the namespace, and return it."""
+		
+		module = import_module(self.package)
+		
+		try:
+			value = getattr(module, self.name)
+		except AttributeError:  # As per `from package import name`, fall back on importing a submodule.
+			value = import_module(self.package + '.' + self.name)
+		
+		if self.namespace.get(self.alias) is self:
+			self.namespace[self.alias] = value
+		
+		return value
+	
+	def __getattr__(self, name):
+		return getattr(self.resolve(), name)
+	
+	def __call__(self, *args, **kw):
+		return self.resolve()(*args, **kw)
+
+
+class Lazy(object):
+	"""Runtime support referenced by generated code as `__lazy__`.
+	
+	Registers stub functions and, when called from one, compiles and installs the real function it stands in for.
+	Also assigns proxies lazily importing objects into module namespaces.
+	
+	Attributes:
+	
+	- `stubs`: Map the identity of the original code object of each registered stub function to that function.
+	- `lock`: Serializes the loading of real functions.
+	"""
+	
+	__slots__ = ('stubs', 'lock')
+	
+	def __init__(self):
+		self.stubs = WeakValueDictionary()
+		self.lock = Lock()
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}(stubs={1})'.format(self, len(self.stubs))
+	
+	def imports(self, namespace, package, *names):
+		"""Assign proxies lazily importing the given names, optionally `name as alias`, from a package."""
+		
+		for name in names:
+			name, _, alias = name.partition(' as ')
+			proxy = Import(namespace, package, name.strip(), alias.strip() or None)
+			namespace[proxy.alias] = proxy
+	
+	def stub(self, payload):
+		"""Decorate a stub function, associating it with the compressed source of the real function."""
+		
+		def decorator(fn):
+			fn.__lazy__ = payload
+			fn.__stub__ = fn.__code__  # Retained, so its identity is not reused while the stub is registered.
+			self.stubs[id(fn.__code__)] = fn  # Equal code objects may be compiled within different modules.
+			return fn
+		
+		return decorator
+	
+	def load(self, fn, code):
+		"""Compile the real function a stub stands in for, and install its code into the stub.
+		
+		Has no effect if the stub, originally having the given code, has already been loaded.
+		"""
+		
+		with self.lock:
+			if fn.__code__ is code:
+				self._load(fn, code)
+	
+	def _load(self, fn, code):
+		source = decompress(b64decode(fn.__lazy__)).decode('utf8')
+		
+		if __debug__:
+			log.debug("Compiling deferred function " + code.co_name + " of " + code.co_filename)
+		
+		# Offset so that line numbers within the real function match their position in the generated module.
+		module = compile("\n" * (code.co_firstlineno - 1) + source, code.co_filename, 'exec')
+		
+		for constant in module.co_consts:
+			if isinstance(constant, CodeType) and constant.co_name == code.co_name:
+				break
+		else:
+			raise RuntimeError("Deferred source of " + code.co_name + " does not declare it.")
+		
+		fn.__code__ = constant
+		del fn.__lazy__
+	
+	def __call__(self, arguments):
+		"""Load and invoke the real function of the calling stub, given the stub's `locals()`, i.e. its arguments."""
+		
+		code = sys._getframe(1).f_code
+		fn = self.stubs.get(id(code))
+		
+		if fn is None:
+			raise RuntimeError("Deferred function " + code.co_name + " was not registered as a stub.")
+		
+		sig = signature(fn)
+		self.load(fn, code)
+		
+		bound = BoundArguments(sig, dict((name, arguments[name]) for name in sig.parameters))
+		
+		return fn(*bound.args, **bound.kwargs)
+
+
+__lazy__ = Lazy()  # The process-wide registry of stub functions referenced by generated code.
@@ -0,0 +1,130 @@
+# encoding: utf-8
+
+"""Build manifests describing the translation of DSL source files, for content-addressed build caches.
+
+Translation is deterministic for a given input, encoding, set of translators, and runtime. Each manifest entry records
+the SHA-256 digest of a file's source and of its translated output, the canonical encoding name and the flags and
+options it declares, the version of this package, the qualified name and distribution version of each translator
+applied, and the Python version and `__debug__` state (i.e. whether `-O` was given) the translation was performed
+under. The `key` of an entry digests all of these except the output, identifying the translation before it is
+performed, so a remote cache may skip the work.
+
+Generate a manifest for files, or directories searched recursively for DSL modules, using:
+
+	python -m marrow.dsl.manifest [--output FILE] [--encoding NAME] PATH [PATH ...]
+
+Manifests are JSON, with sorted keys, mapping each path to its entry.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from codecs import lookup
+from hashlib import sha256
+
+from .core.decoder import decoder
+from .preload import encoding as declared
+from .release import version
+
+
+def digest(data):
+	if not isinstance(data, bytes):
+		data = data.encode('utf8')
+	
+	return sha256(data).hexdigest()
+
+
+def describe(source, encoding):
+	"""Translate DSL source, given as bytes, using the named encoding, returning its manifest entry and the output.
+	
+	The output is exactly that produced by the codec when importing the source.
+	"""
+	
+	instance = decoder(encoding)
+	
+	if instance is None:
+		raise LookupError("Not a DSL encoding: " + encoding)
+	
+	entry = {
+			'input': digest(source),
+			'encoding': str(instance),
+			'flags': sorted(instance.flags),
+			'options': [list(option) for option in instance.options],
+			'version': version,
+			'translators': [list(translator) for translator in instance.versions],
+			'python': list(sys.version_info[:2]),
+			'debug': __debug__,
+		}
+	
+	entry['key'] = digest(json.dumps(entry, sort_keys=True))
+	output = lookup(encoding).decode(source)[0]
+	entry['output'] = digest(output)
+	
+	return entry, output
+
+
+def paths(roots):
+	"""Iterate the given files, and the declared DSL modules within the given directories, in sorted order."""
+	
+	for root in roots:
+		if not os.path.isdir(root):
+			yield root
+			continue
+		
+		for base, directories, files in os.walk(root):
+			directories.sort()
+			
+			for name in sorted(files):
+				path = os.path.join(base, name)
+				
+				if name.endswith('.py') and declared(path):
+					yield path
+
+
+def manifest(roots, encoding=None):
+	"""Produce manifest entries for the given files or directories, keyed by path.
+	
+	Each file is translated using the given encoding, or that declared by the file itself.
+	"""
+	
+	entries = {}
+	
+	for path in paths(roots):
+		name = encoding or declared(path)
+		
+		if not name:
+			raise LookupError("No DSL encoding given or declared for: " + path)
+		
+		with open(path, 'rb') as fh:
+			entries[path] = describe(fh.read(), name)[0]
+	
+	return entries
+
+
+def main(argv=None):
+	parser = ArgumentParser(prog='python -m marrow.dsl.manifest', description="Describe the translation of DSL files.")
+	parser.add_argument('-o', '--output', default=None, help="write the manifest to this file; default: standard out")
+	parser.add_argument('-e', '--encoding', default=None, help="encoding to translate using, overriding declarations")
+	parser.add_argument('path', nargs='+', help="DSL source file, or directory to search for them")
+	arguments = parser.parse_args(argv)
+	
+	try:
+		entries = manifest(arguments.path, arguments.encoding)
+	except LookupError as e:
+		parser.error(str(e))
+	
+	text = json.dumps(entries, indent=4, sort_keys=True, separators=(',', ': '))
+	
+	if not arguments.output:
+		print(text)
+		return
+	
+	with open(arguments.output, 'w') as fh:
+		print(text, file=fh)
+
+
+if __name__ == '__main__':
+	main()
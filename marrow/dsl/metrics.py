@@ -0,0 +1,138 @@
+# encoding: utf-8
+
+"""Runtime support for instrumented generated code, counting the calls to and time spent within DSL functions.
+
+When a DSL's decoder accepts, and is given, the `instrument` flag, the body of each top-level function is wrapped to
+record its duration, and each function is allocated a slot within the table of its module prior to its definition:
+
+	__table__, __metric_12__ = __metrics__.slot(__name__, 'render', 12)
+
+	def render(items):
+		__started__ = __clock__()
+		try:
+			...
+		finally:
+			__table__.counts[__metric_12__] += 1
+			__table__.times[__metric_12__] += __clock__() - __started__
+
+Slots are named by the source line number of the function's declaration, and the function's name. Without the flag,
+nothing is emitted. Read the collected results from the process-wide `registry`.
+
+The time recorded for generator functions is that elapsed between the first iteration and their completion, including
+any time spent suspended between iterations, e.g. while the consumer processes each value yielded.
+
+Counters are updated without locking to minimize overhead; updating an array element is not atomic, thus calls made
+concurrently from multiple threads may occasionally go uncounted, or their time unrecorded. Treat results gathered
+from multi-threaded processes as approximate.
+"""
+
+from __future__ import unicode_literals
+
+from array import array
+from threading import Lock
+
+
+class Table(object):
+	"""The call counts and cumulative times of the instrumented functions of a single module.
+	
+	Attributes:
+	
+	- `module`: The name of the module.
+	- `functions`: The name and source line number of each function, in slot order.
+	- `slots`: Map the name and source line number of each function to its slot index.
+	- `counts`: An array of the number of calls made to each function.
+	- `times`: An array of the cumulative number of seconds spent within each function.
+	"""
+	
+	__slots__ = ('module', 'functions', 'slots', 'counts', 'times')
+	
+	def __init__(self, module):
+		self.module = module
+		self.functions = []
+		self.slots = {}
+		self.counts = array('d')  # Doubles count exactly well beyond any practical number of calls.
+		self.times = array('d')
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({0.module!r}, functions={1})'.format(self, len(self.functions))
+	
+	def __iter__(self):
+		"""Iterate the name, line number, call count, and cumulative time of each function."""
+		
+		for i, (name, line) in enumerate(self.functions):
+			yield name, line, int(self.counts[i]), self.times[i]
+	
+	def register(self, name, line):
+		"""Allocate a slot to the named function, returning its index; a function reloaded retains its slot."""
+		
+		key = (name, line)
+		index = self.slots.get(key)
+		
+		if index is None:
+			index = self.slots[key] = len(self.functions)
+			self.functions.append(key)
+			self.counts.append(0)
+			self.times.append(0)
+		
+		return index
+	
+	def reset(self):
+		for i in range(len(self.functions)):
+			self.counts[i] = 0
+			self.times[i] = 0
+
+
+class Registry(object):
+	"""The tables of instrumented modules.
+	
+	Attributes:
+	
+	- `tables`: Map module names to their `Table`.
+	- `lock`: Serializes the allocation of tables and slots.
+	"""
+	
+	__slots__ = ('tables', 'lock')
+	
+	def __init__(self):
+		self.tables = {}
+		self.lock = Lock()
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}(modules={1})'.format(self, len(self.tables))
+	
+	def __iter__(self):
+		"""Iterate the module name, function name, line number, call count, and cumulative time of every function."""
+		
+		for module, table in sorted(self.tables.items()):
+			for record in table:
+				yield (module, ) + record
+	
+	def slot(self, module, name, line):
+		"""Allocate a slot to a function of the named module, returning the module's table and the slot index."""
+		
+		with self.lock:
+			table = self.tables.get(module)
+			
+			if table is None:
+				table = self.tables[module] = Table(module)
+			
+			return table, table.register(name, line)
+	
+	def reset(self):
+		"""Zero all counters, retaining allocated slots."""
+		
+		for table in list(self.tables.values()):
+			table.reset()
+	
+	def report(self, limit=None):
+		"""Produce a textual summary of the functions which have been called, by descending cumulative time."""
+		
+		records = sorted((i for i in self if i[3]), key=lambda record: -record[4])
+		
+		yield "{:>10} {:>12} {:>12}  {}".format("calls", "total (s)", "per call (ms)", "function")
+		
+		for module, name, line, count, time in records[:limit]:
+			yield "{:>10} {:>12.6f} {:>12.6f}  {}:{} (line {})".format(count, time, time / count * 1000, module, name, line)
+
+
+registry = Registry()  # The process-wide registry referenced by instrumented generated code as `__metrics__`.
@@ -0,0 +1,143 @@
+# encoding: utf-8
+
+"""Preloading of DSL modules within the master process of a pre-forking server.
+
+Importing every DSL module under a package before forking spares each worker the cost of doing so, and, once frozen,
+allows the workers to share the memory pages holding them:
+
+	from marrow.dsl.preload import preload
+
+	report = preload('myapp.templates')
+	log.info(report)
+
+DSL modules are identified by a source encoding declaration naming a registered DSL. They are imported as usual, thus
+use any bytecode cached by an earlier import in place of translating the source again.
+
+Freezing requires Python 3.7 or newer; on earlier runtimes objects are collected, but not frozen.
+"""
+
+from __future__ import unicode_literals
+
+import gc
+import os
+import pkgutil
+import re
+import time
+from collections import namedtuple
+from importlib import import_module
+
+from .core.decoder import decoder
+
+
+log = __import__('logging').getLogger(__name__)
+
+CODING = re.compile(br'^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)')  # As per PEP 263.
+
+
+class Preloaded(namedtuple('Preloaded', ('modules', 'failed', 'seconds', 'memory', 'frozen'))):
+	"""The result of preloading.
+	
+	- `modules`: The names of the DSL modules imported.
+	- `failed`: A mapping of the names of DSL modules which failed to import to the exception raised.
+	- `seconds`: The time taken to import, collect, and freeze.
+	- `memory`: The growth in resident memory, in bytes, or None if unavailable on this platform.
+	- `frozen`: The number of objects in the permanent generation after freezing, or None if not frozen.
+	"""
+	
+	__slots__ = ()
+	
+	def __str__(self):
+		return "Preloaded {} DSL modules ({} failed) in {:.3f}s using {} of memory, {} objects frozen.".format(
+				len(self.modules),
+				len(self.failed),
+				self.seconds,
+				'unknown' if self.memory is None else '{:.1f} MiB'.format(self.memory / 1048576.0),
+				'no' if self.frozen is None else self.frozen,
+			)
+
+
+def _resident():
+	"""The resident set size of the current process, in bytes, or None if unavailable."""
+	
+	try:
+		with open('/proc/self/statm', 'rb') as fh:
+			return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+	except (IOError, OSError, ValueError, AttributeError):
+		return None
+
+
+def encoding(path):
+	"""Return the name of the DSL a source file is declared to be encoded using, or None."""
+	
+	try:
+		with open(path, 'rb') as fh:
+			lines = [fh.readline(), fh.readline()]  # The declaration must appear within the first two lines.
+	except (IOError, OSError):
+		return None
+	
+	for line in lines:
+		match = CODING.match(line)
+		
+		if match:
+			name = match.group(1).decode('ascii')
+			return name if decoder(name) is not None else None
+
+
+def discover(package):
+	"""Iterate the names of the DSL modules within a package, given by name, recursively."""
+	
+	package = import_module(package)
+	
+	for finder, name, ispkg in pkgutil.walk_packages(package.__path__, package.__name__ + '.'):
+		if ispkg:
+			continue
+		
+		path = getattr(finder, 'path', None)
+		
+		if path is None:  # Not a file system location; e.g. a zip archive.
+			continue
+		
+		if encoding(os.path.join(path, name.rpartition('.')[2] + '.py')):
+			yield name
+
+
+def preload(*packages, **kw):
+	"""Import every DSL module within the named packages, then collect and freeze the results.
+	
+	Pass `freeze=False` to skip freezing, e.g. when preloading outside of a pre-forking server.
+	"""
+	
+	freeze = kw.pop('freeze', True)
+	
+	if kw:
+		raise TypeError("Unexpected keyword arguments: " + ', '.join(sorted(kw)))
+	
+	start = time.time()
+	memory = _resident()
+	modules = []
+	failed = {}
+	
+	for package in packages:
+		for name in discover(package):
+			try:
+				import_module(name)
+			except Exception as e:
+				log.warning("Unable to preload DSL module " + name + ": " + repr(e))
+				failed[name] = e
+				continue
+			
+			modules.append(name)
+	
+	gc.collect()
+	frozen = None
+	
+	if freeze and hasattr(gc, 'freeze'):
+		gc.freeze()  # Move everything to the permanent generation, sparing their pages from collector writes.
+		frozen = gc.get_freeze_count()
+	
+	after = _resident()
+	
+	result = Preloaded(modules, failed, time.time() - start, None if memory is None else after - memory, frozen)
+	log.info(str(result))
+	
+	return result
@@ -0,0 +1,225 @@
+# encoding: utf-8
+
+"""A low-overhead sampling profiler attributing time spent within generated code to lines of DSL source.
+
+A background thread periodically samples the stacks of all other threads. Frames of generated modules, identified by
+their `__gzmapping__`, have their line numbers mapped back to the DSL source; the mapping of each module is decoded
+once and cached. Other frames, including those of function implementations shared using `dedupe`, are reported as-is.
+
+Use as a context manager, or run a script under the profiler:
+
+	python -m marrow.dsl.profiler [--interval MS] [--collapsed FILE] script.py [args ...]
+
+Reports are available as "collapsed stacks", one line per unique stack of semicolon-separated frames followed by its
+sample count, as consumed by flame graph tools, and as text summarizing the hottest DSL lines and functions.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import os
+import sys
+import threading
+import time
+from argparse import REMAINDER, ArgumentParser
+from collections import Counter
+
+from .core.util import redelta_decode
+
+
+class Sampler(object):
+	"""Sample the stacks of running threads, counting identical stacks.
+	
+	Attributes:
+	
+	- `interval`: The number of seconds to wait between samples.
+	- `samples`: A `Counter` of stacks, each a tuple of frames from outermost to innermost.
+	- `mappings`: Decoded line number mappings, keyed by the encoded `__gzmapping__` they were decoded from.
+	- `frames`: Cached frame descriptions, keyed by code object, file name, line number, and encoded mapping.
+	- `thread`: The sampling thread, while running.
+	
+	Each frame is described by a tuple of the file name, function name, line number, and whether the line number was
+	mapped to DSL source.
+	"""
+	
+	__slots__ = ('interval', 'samples', 'mappings', 'frames', 'thread', '_running')
+	
+	def __init__(self, interval=0.005):
+		self.interval = interval
+		self.samples = Counter()
+		self.mappings = {}
+		self.frames = {}
+		self.thread = None
+		self._running = False
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}(interval={0.interval}, samples={1})'.format(self, sum(self.samples.values()))
+	
+	def __enter__(self):
+		self.start()
+		return self
+	
+	def __exit__(self, type, value, traceback):
+		self.stop()
+	
+	def start(self):
+		if self.thread is not None:
+			return
+		
+		self._running = True
+		self.thread = threading.Thread(target=self._run, name='marrow.dsl.profiler')
+		self.thread.daemon = True
+		self.thread.start()
+	
+	def stop(self):
+		if self.thread is None:
+			return
+		
+		self._running = False
+		self.thread.join()
+		self.thread = None
+	
+	def _run(self):
+		ident = threading.current_thread().ident
+		
+		while self._running:
+			self.sample(ident)
+			time.sleep(self.interval)
+	
+	def sample(self, exclude=None):
+		"""Record the current stack of every thread, other than the excluded thread identifier."""
+		
+		for ident, frame in sys._current_frames().items():
+			if ident == exclude:
+				continue
+			
+			stack = []
+			
+			while frame is not None:
+				stack.append(self.describe(frame))
+				frame = frame.f_back
+			
+			stack.reverse()
+			self.samples[tuple(stack)] += 1
+	
+	def describe(self, frame):
+		"""Describe a frame, mapping its line number back to DSL source if it is within a generated module."""
+		
+		code = frame.f_code
+		line = frame.f_lineno
+		encoded = frame.f_globals.get('__gzmapping__')
+		key = (code, code.co_filename, line, encoded)  # Code objects compare equal across modules.
+		description = self.frames.get(key)
+		
+		if description is None:
+			# Shared code is numbered relative to its own source, not that of the module whose globals it runs within.
+			shared = code.co_filename.startswith('<marrow.dsl.dedupe:')
+			mapped = None if shared else self.mapping(encoded)
+			number = mapped[line - 1] if mapped and 0 < line <= len(mapped) else 0
+			description = self.frames[key] = (code.co_filename, code.co_name, number or line, bool(number))
+		
+		return description
+	
+	def mapping(self, encoded):
+		"""Decode, once, the line number mapping of a generated module."""
+		
+		if not encoded:
+			return None
+		
+		mapped = self.mappings.get(encoded)
+		
+		if mapped is None:
+			try:
+				mapped = redelta_decode(encoded)
+			except Exception:
+				mapped = []
+			
+			self.mappings[encoded] = mapped
+		
+		return mapped
+	
+	@staticmethod
+	def _label(frame):
+		return '{0}:{1}:{2}'.format(*frame)
+	
+	def collapsed(self):
+		"""Produce the samples in collapsed stack format, one line per unique stack, e.g. for flame graph tools."""
+		
+		for stack, count in sorted(self.samples.items(), key=lambda item: -item[1]):
+			yield ';'.join(self._label(frame) for frame in stack) + ' ' + str(count)
+	
+	def hot(self, key):
+		"""Count samples by the given key of DSL frames, returning `(self, total)` counters.
+		
+		Self samples are those whose innermost DSL frame matched; total samples are those including a matching frame.
+		"""
+		
+		own = Counter()
+		total = Counter()
+		
+		for stack, count in self.samples.items():
+			keys = [key(frame) for frame in stack if frame[3]]
+			
+			if not keys:
+				continue
+			
+			own[keys[-1]] += count
+			
+			for k in set(keys):
+				total[k] += count
+		
+		return own, total
+	
+	def report(self, limit=20):
+		"""Produce a textual summary of the hottest DSL source lines and functions."""
+		
+		samples = sum(self.samples.values())
+		
+		yield "{} samples at {:.1f}ms intervals.".format(samples, self.interval * 1000)
+		
+		for title, key in (
+				("DSL source lines", lambda frame: '{0}:{2} ({1})'.format(*frame)),
+				("DSL functions", lambda frame: '{0}:{1}'.format(*frame)),
+			):
+			own, total = self.hot(key)
+			
+			yield ""
+			yield title + ":"
+			yield "{:>8} {:>8}  {}".format("self", "total", "location")
+			
+			for location, count in own.most_common(limit):
+				yield "{:>8} {:>8}  {}".format(count, total[location], location)
+
+
+def main(argv=None):
+	parser = ArgumentParser(prog='python -m marrow.dsl.profiler', description="Profile a script, mapping DSL lines.")
+	parser.add_argument('-i', '--interval', type=float, default=5.0, help="milliseconds between samples")
+	parser.add_argument('-c', '--collapsed', default=None, help="write collapsed stacks to this file")
+	parser.add_argument('-n', '--limit', type=int, default=20, help="number of entries to report")
+	parser.add_argument('script', help="the Python script to run")
+	parser.add_argument('arguments', nargs=REMAINDER, help="arguments to the script")
+	arguments = parser.parse_args(argv)
+	
+	sys.argv = [arguments.script] + arguments.arguments
+	sys.path.insert(0, os.path.dirname(os.path.abspath(arguments.script)))
+	
+	with open(arguments.script, 'rb') as fh:
+		code = compile(fh.read(), arguments.script, 'exec')
+	
+	sampler = Sampler(arguments.interval / 1000.0)
+	
+	try:
+		with sampler:
+			exec(code, {'__name__': '__main__', '__file__': arguments.script})
+	
+	finally:
+		if arguments.collapsed:
+			with open(arguments.collapsed, 'w') as fh:
+				for line in sampler.collapsed():
+					print(line, file=fh)
+		
+		for line in sampler.report(arguments.limit):
+			print(line, file=sys.stderr)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,292 @@
+# encoding: utf-8
+
+"""A long-running local translation daemon, and client, for build tools and editors.
+
+Run using `python -m marrow.dsl.serve [--socket PATH] [--encoding NAME ...]` to listen on a Unix domain socket,
+keeping decoders and their translators warm between requests. Named encodings are prepared at startup.
+
+Messages in either direction are UTF-8 encoded JSON objects, each prefixed by its length as a four byte, big-endian,
+unsigned integer. Requests provide the DSL `source` text and `encoding` name; responses provide the translated
+`output` text, the canonical `encoding` name, and the source line number of each output line as `mapping`, or an
+`error` message. Multiple requests may be made over a single connection.
+
+The socket is accessible only to the user running the daemon. By default it is placed within `XDG_RUNTIME_DIR`, if
+set, otherwise within a directory of the system temporary directory private to the user, created if missing. Clients
+only use a daemon run by the same user, identified by the credentials of the peer where the platform provides them,
+e.g. Linux, otherwise by the ownership of the socket and its directory; other daemons are ignored.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import errno
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+from argparse import ArgumentParser
+from tempfile import gettempdir
+
+from .compat import str
+from .core.decoder import decoder
+
+try:
+	from socketserver import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+except ImportError:  # pragma: no cover
+	from SocketServer import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+
+
+log = __import__('logging').getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+CREDENTIALS = struct.Struct('3i')  # The process, user, and group identifiers of a peer, as given by `SO_PEERCRED`.
+
+
+def default_path():
+	"""The default socket path, within a directory private to the current user."""
+	
+	name = 'marrow-dsl-{}'.format(os.getuid())
+	base = os.environ.get('XDG_RUNTIME_DIR') or os.path.join(gettempdir(), name)
+	
+	return os.path.join(base, name + '.sock')
+
+
+def secure(directory):
+	"""Determine if other users are unable to replace the contents of a directory.
+	
+	The directory must be owned by the current user, or the superuser, and writable only by its owner unless sticky.
+	"""
+	
+	try:
+		status = os.stat(directory)
+	except OSError:
+		return False
+	
+	if status.st_uid not in (os.getuid(), 0):
+		return False
+	
+	return not status.st_mode & (stat.S_IWGRP | stat.S_IWOTH) or bool(status.st_mode & stat.S_ISVTX)
+
+
+def trusted(sock, path):
+	"""Determine if the peer of a socket connected to the given path is run by the current user."""
+	
+	uid = os.getuid()
+	
+	if hasattr(socket, 'SO_PEERCRED'):
+		pid, peer, gid = CREDENTIALS.unpack(sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, CREDENTIALS.size))
+		return peer == uid
+	
+	try:  # Otherwise, a socket we own within a directory others are unable to replace it within.
+		return os.stat(path).st_uid == uid and secure(os.path.dirname(os.path.abspath(path)))
+	except OSError:
+		return False
+
+
+def listening(path):
+	"""Determine if a daemon is accepting connections on the socket at the given path."""
+	
+	sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	
+	try:
+		sock.connect(path)
+	except (socket.error, OSError):
+		return False
+	finally:
+		sock.close()
+	
+	return True
+
+
+def send(stream, message):
+	"""Write a length-prefixed JSON message to a file-like stream."""
+	
+	payload = json.dumps(message).encode('utf8')
+	stream.write(HEADER.pack(len(payload)) + payload)
+	stream.flush()
+
+
+def receive(stream):
+	"""Read a length-prefixed JSON message from a file-like stream, or return None at the end of the stream."""
+	
+	header = stream.read(HEADER.size)
+	
+	if len(header) < HEADER.size:
+		return None
+	
+	length, = HEADER.unpack(header)
+	payload = stream.read(length)
+	
+	if len(payload) < length:
+		return None
+	
+	return json.loads(payload.decode('utf8'))
+
+
+def translate_locally(source, encoding):
+	"""Translate within the current process, returning a response as the daemon would."""
+	
+	instance = decoder(encoding)
+	
+	if instance is None:
+		return {'error': "Unknown DSL encoding: " + encoding}
+	
+	try:
+		output, mapping = instance.translate(source)
+	except Exception as e:
+		return {'error': str(e)}
+	
+	return {'output': output, 'mapping': mapping, 'encoding': str(instance)}
+
+
+class TranslationHandler(StreamRequestHandler):
+	"""Serve translation requests made over a single connection until the client disconnects."""
+	
+	def handle(self):
+		while True:
+			request = receive(self.rfile)
+			
+			if request is None:
+				return
+			
+			try:
+				response = translate_locally(request['source'], request['encoding'])
+			except (KeyError, TypeError):
+				response = {'error': "Requests require `source` and `encoding` values."}
+			
+			send(self.wfile, response)
+
+
+class TranslationServer(ThreadingMixIn, UnixStreamServer):
+	"""A Unix domain socket server of translation requests, handling each connection in its own thread."""
+	
+	daemon_threads = True
+	
+	def __init__(self, path=None, handler=TranslationHandler):
+		path = path or default_path()
+		directory = os.path.dirname(os.path.abspath(path))
+		
+		if path == default_path() and not os.path.exists(directory):
+			os.mkdir(directory, 0o700)
+		
+		if not secure(directory):
+			raise OSError(errno.EPERM, "Socket directory may be modified by other users", directory)
+		
+		if os.path.exists(path):
+			if listening(path):
+				raise OSError(errno.EADDRINUSE, "A translation daemon is already listening", path)
+			
+			os.unlink(path)  # Remove a stale socket left behind by an earlier daemon.
+		
+		mask = os.umask(0o177)  # Accessible only to the current user from the moment it is bound.
+		
+		try:
+			UnixStreamServer.__init__(self, path, handler)
+		finally:
+			os.umask(mask)
+	
+	def server_close(self):
+		UnixStreamServer.server_close(self)
+		
+		try:
+			os.unlink(self.server_address)
+		except OSError:
+			pass
+
+
+class Client(object):
+	"""A client of the translation daemon, falling back on in-process translation if the daemon is unavailable.
+	
+	Attributes:
+	
+	- `path`: The path to the daemon's socket.
+	- `timeout`: The number of seconds to wait for a response before falling back.
+	- `connection`: The file-like stream of the open connection, if connected.
+	"""
+	
+	__slots__ = ('path', 'timeout', 'connection')
+	
+	def __init__(self, path=None, timeout=30):
+		self.path = path or default_path()
+		self.timeout = timeout
+		self.connection = None
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({0.path!r}, connected={1})'.format(self, self.connection is not None)
+	
+	def connect(self):
+		"""Connect to the daemon if not already connected, returning True if successful."""
+		
+		if self.connection is None:
+			sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			sock.settimeout(self.timeout)
+			
+			try:
+				sock.connect(self.path)
+			except (socket.error, OSError):
+				sock.close()
+				return False
+			
+			if not trusted(sock, self.path):
+				log.warning("Ignoring translation daemon at " + self.path + " not run by the current user.")
+				sock.close()
+				return False
+			
+			self.connection = sock.makefile('rwb')
+			sock.close()  # The file-like stream retains its own reference.
+		
+		return True
+	
+	def close(self):
+		if self.connection is not None:
+			self.connection.close()
+			self.connection = None
+	
+	def translate(self, source, encoding):
+		"""Translate the given DSL source, returning a response of `output`, `mapping`, and `encoding`, or `error`."""
+		
+		if self.connect():
+			try:
+				send(self.connection, {'source': source, 'encoding': encoding})
+				response = receive(self.connection)
+				
+				if response is not None:
+					return response
+			
+			except (socket.error, OSError, ValueError):
+				pass
+			
+			log.warning("Translation daemon at " + self.path + " failed, translating in-process.")
+			self.close()
+		
+		return translate_locally(source, encoding)
+
+
+def main(argv=None):
+	parser = ArgumentParser(prog='python -m marrow.dsl.serve', description="Serve DSL translation requests.")
+	parser.add_argument('-s', '--socket', default=None, help="socket path; default: " + default_path())
+	parser.add_argument('-e', '--encoding', action='append', default=[], help="encoding to prepare on startup")
+	arguments = parser.parse_args(argv)
+	
+	for encoding in arguments.encoding:  # Warm up requested decoders.
+		if decoder(encoding) is None:
+			parser.error("unknown DSL encoding: " + encoding)
+	
+	try:
+		server = TranslationServer(arguments.socket)
+	except (socket.error, OSError) as e:
+		parser.error(str(e))
+	
+	print("Serving DSL translation requests on " + server.server_address, file=sys.stderr)
+	
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+
+
+if __name__ == '__main__':
+	main()
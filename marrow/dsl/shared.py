@@ -0,0 +1,135 @@
+# encoding: utf-8
+
+"""A bounded cache of byte strings in memory shared by the worker processes of a pre-forking server.
+
+Constructed in the master process prior to forking, the cache occupies an anonymous shared memory mapping inherited
+by each worker; no file system access is required. Assign one to a `Compiler` to share compiled translations, so that
+a template translated by one worker is immediately reusable by all others:
+
+	from marrow.dsl.compiler import compiler
+	from marrow.dsl.shared import SharedCache
+
+	compiler.shared = SharedCache(64 * 1024 * 1024)  # Prior to forking.
+
+Entries are keyed by 20-byte digests and written to a ring; once full, the oldest entries are overwritten. Each key
+maps to one of a fixed number of index slots, thus a key may also evict another sharing its slot.
+
+Reads are lock-free: each slot carries a sequence number, odd while being written, and every entry records its key.
+A read is discarded if the sequence changes or the entry is overwritten while it is copied. Readers never wait, even
+upon a worker exiting while it holds the lock. Writes are serialized using a lock also inherited across the fork.
+
+Validation relies upon writes to the mapping becoming visible to other processes in the order they were made, as on
+x86. Python offers no memory barriers; on weakly ordered platforms, e.g. ARM, a torn read may rarely go undetected.
+
+Requires a platform supporting `fork`, e.g. Linux or macOS.
+"""
+
+from __future__ import unicode_literals
+
+import mmap
+from multiprocessing import Lock
+from struct import Struct
+
+
+CURSOR = Struct('<Q')  # The total number of bytes ever allocated within the ring; the header of the mapping.
+SEQUENCE = Struct('<Q')  # The leading field of each slot, odd while the slot is being written.
+SLOT = Struct('<Q20sQQ')  # The sequence number, key, ring position, and length of the value of an entry.
+ENTRY = Struct('<20sQ')  # The key and value length prefixing each value within the ring.
+
+
+class SharedCache(object):
+	"""A bounded mapping of 20-byte digests to byte strings, held in memory shared with forked processes.
+	
+	Attributes:
+	
+	- `size`: The number of bytes available to store entries, each requiring 28 bytes more than its value.
+	- `slots`: The number of index slots, and thus the maximum number of entries.
+	- `memory`: The shared memory mapping.
+	- `lock`: Serializes writes between all processes sharing the cache.
+	- `hits`: The number of values retrieved by this process.
+	- `misses`: The number of values sought by this process and not found.
+	"""
+	
+	__slots__ = ('size', 'slots', 'memory', 'lock', 'hits', 'misses')
+	
+	def __init__(self, size=64 * 1024 * 1024, slots=16384):
+		self.size = int(size)
+		self.slots = int(slots)
+		self.memory = mmap.mmap(-1, CURSOR.size + self.slots * SLOT.size + self.size)  # Anonymous maps are shared.
+		self.lock = Lock()
+		self.hits = 0
+		self.misses = 0
+	
+	def __repr__(self):
+		return '{0.__class__.__name__}({0.size}, slots={0.slots}, hits={0.hits}, misses={0.misses})'.format(self)
+	
+	def _slot(self, key):
+		"""The offset of the index slot for a key."""
+		
+		return CURSOR.size + SEQUENCE.unpack_from(key)[0] % self.slots * SLOT.size
+	
+	def _start(self, position):
+		"""The offset within the mapping of the given ring position."""
+		
+		return CURSOR.size + self.slots * SLOT.size + position % self.size
+	
+	def get(self, key, default=None):
+		"""Retrieve the value stored for a key, or return the default."""
+		
+		memory = self.memory
+		offset = self._slot(key)
+		sequence, stored, position, length = SLOT.unpack_from(memory, offset)
+		
+		if sequence & 1 or stored != key or position % self.size + ENTRY.size + length > self.size or \
+				CURSOR.unpack_from(memory)[0] > position + self.size:
+			self.misses += 1
+			return default
+		
+		start = self._start(position)
+		header = ENTRY.unpack_from(memory, start)
+		value = memory[start + ENTRY.size:start + ENTRY.size + length]
+		
+		# Discard the value if its slot was rewritten, or it was overwritten within the ring, while it was copied.
+		if header != (key, length) or SEQUENCE.unpack_from(memory, offset)[0] != sequence or \
+				CURSOR.unpack_from(memory)[0] > position + self.size:
+			self.misses += 1
+			return default
+		
+		self.hits += 1
+		return value
+	
+	def set(self, key, value):
+		"""Store a value, evicting the oldest entries as required; returns False if the value is too large to store."""
+		
+		memory = self.memory
+		size = self.size
+		need = ENTRY.size + len(value)
+		
+		if need > size:
+			return False
+		
+		with self.lock:
+			position = CURSOR.unpack_from(memory)[0]
+			
+			if position % size + need > size:  # Values are contiguous; skip the remainder at the end of the ring.
+				position += size - position % size
+			
+			CURSOR.pack_into(memory, 0, position + need)  # Invalidate the entries about to be overwritten first.
+			
+			start = self._start(position)
+			ENTRY.pack_into(memory, start, key, len(value))
+			memory[start + ENTRY.size:start + need] = value
+			
+			offset = self._slot(key)
+			sequence = SEQUENCE.unpack_from(memory, offset)[0] | 1
+			SEQUENCE.pack_into(memory, offset, sequence)
+			SLOT.pack_into(memory, offset, sequence, key, position, len(value))
+			SEQUENCE.pack_into(memory, offset, sequence + 1)
+		
+		return True
+	
+	def clear(self):
+		"""Invalidate every entry by advancing the ring a full revolution."""
+		
+		with self.lock:
+			CURSOR.pack_into(self.memory, 0, CURSOR.unpack_from(self.memory)[0] + self.size + 1)
@@ -0,0 +1,81 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import ast
+
+from ..core.line import Line
+
+
+log = __import__('logging').getLogger(__name__)
+
+unparse = getattr(ast, 'unparse', None)  # Python 3.9 and later.
+
+
+def transform(lines, passes):
+	"""Apply abstract syntax tree transformer passes to the given lines of generated function declarations.
+	
+	The lines are rendered, parsed, and transformed by each pass in turn. Top-level statements within function bodies
+	left unaltered retain their original lines, and line numbers; those altered are regenerated as a whole, each of
+	their lines mapped to the source line of the first.
+	
+	Returns the lines, unaltered, if there are no passes, the lines fail to parse, or the runtime lacks `ast.unparse`.
+	"""
+	
+	lines = list(lines)
+	
+	if not passes or unparse is None:
+		return lines
+	
+	try:
+		tree = ast.parse("\n".join(str(line) for line in lines))
+	except SyntaxError as e:
+		log.debug("Unable to parse generated code for transformation: " + str(e))
+		return lines
+	
+	functions = [node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+	original = ast.dump(tree)
+	headers = {id(node): node.body[0].lineno - 1 for node in functions}
+	statements = {(node.lineno, node.end_lineno): ast.dump(node) for function in functions for node in function.body}
+	
+	for transformer in passes:
+		tree = transformer().visit(tree)
+	
+	if ast.dump(tree) == original:
+		return lines
+	
+	output = []
+	cursor = 0  # The index of the next original line not yet emitted.
+	
+	for function in functions:
+		header = headers[id(function)]
+		output.extend(lines[cursor:header])
+		cursor = header
+		scope = lines[header].scope or 0
+		
+		for node in function.body:
+			if node.lineno > cursor and statements.get((node.lineno, node.end_lineno)) == ast.dump(node):
+				output.extend(lines[cursor:node.end_lineno])
+				cursor = node.end_lineno
+				continue
+			
+			output.extend(lines[cursor:node.lineno - 1])  # Interleaved comments and blank lines.
+			number = lines[node.lineno - 1].number
+			cursor = max(cursor, node.end_lineno)
+			
+			for text in unparse(node).split("\n"):
+				stripped = text.lstrip(' ')
+				output.append(Line(stripped, number, scope + (len(text) - len(stripped)) // 4))
+	
+	output.extend(lines[cursor:])
+	
+	# Regenerated statements may contain multi-line strings which do not survive re-indentation. The transformed tree
+	# is compared as it would be parsed from source, e.g. with a negative constant as the negation of a positive one.
+	try:
+		if ast.dump(ast.parse("\n".join(str(line) for line in output))) == ast.dump(ast.parse(unparse(tree))):
+			return output
+	except SyntaxError:
+		pass
+	
+	log.debug("Transformed code failed to round-trip; retaining original lines.")
+	return lines
@@ -0,0 +1,19 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from ast import NodeTransformer
+
+
+class TreeTransformer(NodeTransformer):
+	"""The basic definition of an abstract syntax tree transformer, or optimizer pass.
+	
+	Instances are applied, in priority order, to the parsed contents of a buffer on exit from its context, after all
+	block and inline transformation. Each pass is identified by a `name` for selection via the `optimize` option.
+	Passes which may alter the observable behaviour of the code they transform are not `safe`, and are only applied
+	if named explicitly.
+	"""
+	
+	name = None
+	priority = 0
+	safe = True
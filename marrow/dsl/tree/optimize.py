@@ -0,0 +1,452 @@
+# encoding: utf-8
+
+"""Optimizer passes cleaning up the idioms typical of generated code.
+
+Select passes by name using the `optimize` decoder option, joining multiple names with hyphens, e.g.
+`cinje.optimize-merge-fold`, or use `optimize-all` to apply every pass in priority order that preserves the behaviour
+of the code it transforms. Passes which may alter observable behaviour, marked as not `safe`, must be named.
+"""
+
+from __future__ import unicode_literals
+
+import ast
+import operator
+
+from .interface import TreeTransformer
+
+
+class MergeYields(TreeTransformer):
+	"""Combine adjacent statements yielding constant strings into a single yield of their concatenation.
+	
+	The combined text produced by the generator is unchanged, but it is produced in fewer, larger chunks. The number
+	of values yielded changes, as does the value sent to, or exception thrown into, the generator at each, thus this
+	pass is unsafe for generators not consumed solely as a stream of text; it is not applied by `optimize-all`.
+	"""
+	
+	name = 'merge'
+	priority = 100
+	safe = False
+	
+	FIELDS = ('body', 'orelse', 'finalbody')
+	
+	def generic_visit(self, node):
+		node = super(MergeYields, self).generic_visit(node)
+		
+		for field in self.FIELDS:
+			statements = getattr(node, field, None)
+			
+			if statements and isinstance(statements, list):
+				setattr(node, field, self.merge(statements))
+		
+		return node
+	
+	@staticmethod
+	def _text(node):
+		"""Return the text yielded by a statement of the form `yield "text"`, or None."""
+		
+		if not isinstance(node, ast.Expr) or not isinstance(node.value, ast.Yield):
+			return None
+		
+		value = node.value.value
+		
+		if isinstance(value, ast.Constant) and isinstance(value.value, str):
+			return value.value
+	
+	def merge(self, statements):
+		result = []
+		run = []
+		
+		for node in statements + [None]:
+			text = None if node is None else self._text(node)
+			
+			if text is not None:
+				run.append((node, text))
+				continue
+			
+			if len(run) > 1:
+				merged = ast.Expr(ast.Yield(ast.Constant(''.join(text for _, text in run))))
+				ast.copy_location(merged, run[0][0])
+				merged.end_lineno = run[-1][0].end_lineno
+				result.append(merged)
+			else:
+				result.extend(node for node, _ in run)
+			
+			run = []
+			
+			if node is not None:
+				result.append(node)
+		
+		return result
+
+
+class FoldConstants(TreeTransformer):
+	"""Evaluate arithmetic, concatenation, and unary operations whose operands are all constant.
+	
+	Operations which would raise, or produce very large results, are left for evaluation at runtime. A sign applied
+	directly to a number, e.g. `-1`, is how Python parses negative literals; these are operands, not folded alone.
+	"""
+	
+	name = 'fold'
+	priority = 200
+	
+	LIMIT = 4096  # The maximum length of a folded string or bytes value, and the maximum magnitude of an exponent.
+	TYPES = (int, float, complex, str, bytes)
+	
+	BINARY = {
+			ast.Add: operator.add,
+			ast.Sub: operator.sub,
+			ast.Mult: operator.mul,
+			ast.Div: operator.truediv,
+			ast.FloorDiv: operator.floordiv,
+			ast.Mod: operator.mod,
+			ast.Pow: operator.pow,
+			ast.LShift: operator.lshift,
+			ast.RShift: operator.rshift,
+			ast.BitOr: operator.or_,
+			ast.BitXor: operator.xor,
+			ast.BitAnd: operator.and_,
+		}
+	
+	UNARY = {
+			ast.UAdd: operator.pos,
+			ast.USub: operator.neg,
+			ast.Invert: operator.invert,
+			ast.Not: operator.not_,
+		}
+	
+	SIGNS = (ast.UAdd, ast.USub)
+	NUMBERS = (int, float, complex)
+	
+	def _constant(self, node):
+		return isinstance(node, ast.Constant) and type(node.value) in self.TYPES and not isinstance(node.value, bool)
+	
+	def _literal(self, node):
+		"""Determine if the node is a signed number literal, e.g. `-1`."""
+		
+		return isinstance(node, ast.UnaryOp) and isinstance(node.op, self.SIGNS) and \
+				isinstance(node.operand, ast.Constant) and type(node.operand.value) in self.NUMBERS
+	
+	def _operand(self, node):
+		"""Determine if the node is a constant operand."""
+		
+		return self._constant(node) or self._literal(node)
+	
+	def _value(self, node):
+		"""The value of a constant operand."""
+		
+		if isinstance(node, ast.UnaryOp):
+			return self.UNARY[type(node.op)](node.operand.value)
+		
+		return node.value
+	
+	def _safe(self, op, left, right):
+		"""Determine if evaluating the operation is bounded in time and space."""
+		
+		if isinstance(op, ast.Pow):
+			return isinstance(right, (int, float)) and abs(right) <= 64
+		
+		if isinstance(op, ast.LShift):
+			return isinstance(right, int) and 0 <= right <= 64
+		
+		if isinstance(op, ast.Mult) and isinstance(left, (str, bytes, int)) and isinstance(right, (str, bytes, int)):
+			if isinstance(left, int) and isinstance(right, int):
+				return True
+			
+			count = left if isinstance(left, int) else right
+			value = right if isinstance(left, int) else left
+			
+			return len(value) * max(count, 0) <= self.LIMIT
+		
+		if isinstance(op, ast.Mod) and isinstance(left, (str, bytes)):
+			return False  # String formatting; leave to runtime.
+		
+		return True
+	
+	def visit_BinOp(self, node):
+		node = self.generic_visit(node)
+		handler = self.BINARY.get(type(node.op))
+		
+		if handler is None or not self._operand(node.left) or not self._operand(node.right):
+			return node
+		
+		left, right = self._value(node.left), self._value(node.right)
+		
+		if not self._safe(node.op, left, right):
+			return node
+		
+		try:
+			value = handler(left, right)
+		except Exception:
+			return node
+		
+		if isinstance(value, (str, bytes)) and len(value) > self.LIMIT:
+			return node
+		
+		return ast.copy_location(ast.Constant(value), node)
+	
+	def visit_UnaryOp(self, node):
+		node = self.generic_visit(node)
+		handler = self.UNARY.get(type(node.op))
+		
+		if handler is None or self._literal(node) or not self._operand(node.operand):
+			return node
+		
+		try:
+			value = handler(self._value(node.operand))
+		except Exception:
+			return node
+		
+		return ast.copy_location(ast.Constant(value), node)
+
+
+class HoistLookups(TreeTransformer):
+	"""Hoist repeated bound method lookups out of loops into local variables assigned before the loop.
+	
+	A method lookup of the form `name.attr(...)` within a loop is hoisted if `name` is a local variable of the function
+	not rebound within the loop, and the same lookup was already performed unconditionally by a preceding simple
+	statement of the enclosing blocks, with `name` not rebound since. The lookup is thus known to succeed before the
+	loop is entered, where it is repeated once. Methods whose name is assigned as an attribute anywhere within the
+	function, and names declared `global` or `nonlocal`, are never hoisted; code called from within the loop is assumed
+	not to replace the method.
+	
+	Global and builtin names are not hoisted: they may be undefined where a loop body would never have looked them up,
+	and may be rebound while the loop runs. Nested scopes (functions, lambdas, classes, and comprehensions) are left
+	untouched.
+	"""
+	
+	name = 'hoist'
+	priority = 300
+	
+	PREFIX = '_hoisted_'
+	SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef, ast.ListComp, ast.SetComp,
+			ast.DictComp, ast.GeneratorExp)
+	LOOPS = (ast.For, ast.AsyncFor, ast.While)
+	SIMPLE = (ast.Expr, ast.Assign, ast.AugAssign, ast.AnnAssign)
+	BLOCKS = ('body', 'orelse', 'finalbody', 'handlers')
+	
+	def visit_FunctionDef(self, node):
+		declared = {name for child in ast.walk(node) if isinstance(child, (ast.Global, ast.Nonlocal))
+				for name in child.names}
+		local = {child.arg for child in self._walk(node.args) if isinstance(child, ast.arg)}
+		
+		for statement in node.body:
+			local |= self._bound(statement)
+		
+		node.body = self._hoist(node.body, local - declared, self._attributes(node), set())
+		
+		return node
+	
+	visit_AsyncFunctionDef = visit_FunctionDef
+	
+	def _attributes(self, function):
+		"""Identify the attribute names assigned anywhere within the function."""
+		
+		return {node.attr for node in ast.walk(function) if isinstance(node, ast.Attribute) and
+				not isinstance(node.ctx, ast.Load)}
+	
+	def _walk(self, node):
+		"""Iterate the nodes within the current scope; nested scopes are included, but not their contents."""
+		
+		for child in ast.iter_child_nodes(node):
+			yield child
+			
+			if isinstance(child, self.SCOPES):
+				continue
+			
+			for descendant in self._walk(child):
+				yield descendant
+	
+	def _bound(self, statement):
+		"""The names bound within the current scope by the given statement."""
+		
+		names = set()
+		
+		for node in [statement] + list(self._walk(statement)):
+			if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+				names.add(node.id)
+			elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+				names.add(node.name)
+			elif isinstance(node, ast.alias):
+				names.add((node.asname or node.name).partition('.')[0])
+			elif isinstance(node, ast.ExceptHandler) and node.name:
+				names.add(node.name)
+		
+		return names
+	
+	def _unconditional(self, node):
+		"""Iterate the nodes within the current scope evaluated whenever the given node is evaluated."""
+		
+		if isinstance(node, ast.BoolOp):
+			children = node.values[:1]
+		elif isinstance(node, ast.IfExp):
+			children = [node.test]
+		else:
+			children = ast.iter_child_nodes(node)
+		
+		for child in children:
+			if isinstance(child, self.SCOPES):
+				continue
+			
+			yield child
+			
+			for descendant in self._unconditional(child):
+				yield descendant
+	
+	def _performed(self, known, statement, local, attributes):
+		"""The method lookups known to have been performed, and not since invalidated, following the statement."""
+		
+		bound = self._bound(statement)
+		known = {key for key in known if key[0] not in bound}
+		
+		if isinstance(statement, self.SIMPLE):
+			for node in self._unconditional(statement):
+				if isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Load) and \
+						isinstance(node.value, ast.Name) and node.value.id in local and \
+						node.value.id not in bound and node.attr not in attributes:
+					known.add((node.value.id, node.attr))
+		
+		return known
+	
+	def _hoist(self, statements, local, attributes, known):
+		result = []
+		
+		for statement in statements:
+			if isinstance(statement, self.LOOPS):
+				result.extend(self._loop(statement, local, known))
+			
+			elif not isinstance(statement, self.SCOPES):
+				inner = {key for key in known if key[0] not in self._bound(statement)}  # Blocks may run after others.
+				
+				for field in self.BLOCKS:
+					block = getattr(statement, field, None)
+					
+					if not block or not isinstance(block, list):
+						continue
+					
+					if field == 'handlers':
+						for handler in block:
+							handler.body = self._hoist(handler.body, local, attributes, inner)
+					else:
+						setattr(statement, field, self._hoist(block, local, attributes, inner))
+				
+				result.append(statement)
+			
+			else:
+				result.append(statement)
+			
+			known = self._performed(known, statement, local, attributes)
+		
+		return result
+	
+	def _loop(self, loop, local, known):
+		"""Return the assignments of lookups hoisted from the given loop, followed by the rewritten loop."""
+		
+		bound = self._bound(loop)
+		methods = {}
+		
+		for node in self._repeated(loop):
+			if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and \
+					isinstance(node.func.value, ast.Name):
+				key = (node.func.value.id, node.func.attr)
+				
+				if key in known and key[0] not in bound:
+					methods.setdefault(key, self.PREFIX + '_'.join(key))
+		
+		methods = {k: v for k, v in methods.items() if v not in local}
+		
+		if not methods:
+			return [loop]
+		
+		assignments = []
+		
+		for (name, attr), alias in sorted(methods.items()):
+			value = ast.Attribute(ast.Name(name, ast.Load()), attr, ast.Load())
+			assignments.append(self._assign(alias, value, loop))
+		
+		_Rename(methods, loop).rewrite()
+		
+		return assignments + [loop]
+	
+	def _repeated(self, loop):
+		"""Iterate the nodes within the current scope evaluated on each iteration of the loop."""
+		
+		roots = [loop.test] if isinstance(loop, ast.While) else []
+		roots.extend(loop.body)
+		roots.extend(loop.orelse)
+		
+		for root in roots:
+			if isinstance(root, self.SCOPES):
+				continue
+			
+			yield root
+			
+			for node in self._walk(root):
+				yield node
+	
+	@staticmethod
+	def _assign(alias, value, loop):
+		node = ast.Assign([ast.Name(alias, ast.Store())], value)
+		ast.copy_location(node, loop)
+		node.end_lineno = loop.lineno
+		
+		return ast.fix_missing_locations(node)
+
+
+class _Rename(ast.NodeTransformer):
+	"""Substitute hoisted method lookups within a loop, leaving the iterable of `for` loops and nested scopes alone."""
+	
+	def __init__(self, methods, loop):
+		self.methods = methods
+		self.loop = loop
+	
+	def rewrite(self):
+		loop = self.loop
+		
+		if isinstance(loop, ast.While):
+			loop.test = self.visit(loop.test)
+		
+		loop.body = [self.visit(statement) for statement in loop.body]
+		loop.orelse = [self.visit(statement) for statement in loop.orelse]
+	
+	def generic_visit(self, node):
+		if isinstance(node, HoistLookups.SCOPES):
+			return node
+		
+		return super(_Rename, self).generic_visit(node)
+	
+	def visit_Call(self, node):
+		func = node.func
+		
+		if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+			alias = self.methods.get((func.value.id, func.attr))
+			
+			if alias:
+				node.func = ast.copy_location(ast.Name(alias, ast.Load()), func)
+				node.args = [self.visit(arg) for arg in node.args]
+				node.keywords = [self.visit(keyword) for keyword in node.keywords]
+				return node
+		
+		return self.generic_visit(node)
+
+
+PASSES = {transformer.name: transformer for transformer in (MergeYields, FoldConstants, HoistLookups)}
+
+
+def passes(spec):
+	"""Resolve an `optimize` option value into the ordered list of optimizer passes it names.
+	
+	Returns an empty list if no value is given. The value `all` names every `safe` pass.
+	"""
+	
+	if not spec:
+		return []
+	
+	if spec == 'all':
+		return sorted((i for i in PASSES.values() if i.safe), key=lambda transformer: transformer.priority)
+	
+	try:
+		selected = [PASSES[name] for name in spec.replace('_', '-').split('-')]
+	except KeyError as e:
+		raise ValueError("Unknown optimizer pass: " + e.args[0])
+	
+	return sorted(selected, key=lambda transformer: transformer.priority)
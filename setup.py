@@ -84,5 +84,6 @@ setup(
 	tests_require = tests_require,
 	extras_require = {
 			'development': tests_require + ['pre-commit'],  # Development requirements are the testing requirements.
+			'numpy': ['numpy'],  # Vectorized pre-scanning of input structure.
 		},
 )
@@ -0,0 +1,94 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from codecs import register
+
+import pytest
+
+from marrow.dsl.block.function import FunctionTransformer
+from marrow.dsl.block.module import ModuleTransformer
+from marrow.dsl.core import Classifier
+from marrow.dsl.core.decoder import GalfiDecoder
+
+
+class Sample(Classifier):
+	"""Classify the lines of a minimal DSL: Python, with function scopes closed by `end`."""
+	
+	priority = -2000
+	
+	def classify(self, context, line):
+		text = line.stripped
+		
+		if not text or text[0] == '#':
+			return
+		
+		if text[0] == '@':
+			line.tag.add('decorator')
+		elif text.startswith('def '):
+			line.tag.add('def')
+		elif text == 'end':
+			line.tag.add('_end')
+		elif text.startswith(('import ', 'from ')):
+			line.tag.add('import')
+		
+		line.tag.add('code')
+
+
+class SampleDecoder(GalfiDecoder):
+	"""The decoder of the `sample` encoding, using fixed translators rather than those of an entry point namespace."""
+	
+	__slots__ = ('_flags', )
+	
+	FLAGS = {'nomap', 'instrument', 'production'}
+	
+	def _load(self, namespace):
+		return [Sample, ModuleTransformer, FunctionTransformer]
+
+
+def search(name):
+	"""Resolve `sample` encodings, e.g. `sample.nomap.cache-64`."""
+	
+	if name.partition('.')[0] == 'sample':
+		return SampleDecoder.new(name)._codec_info
+
+
+register(search)
+
+
+def pytest_addoption(parser):
+	parser.addoption('--slow', action='store_true', default=False, help="run slow, timing dependent tests")
+
+
+def pytest_configure(config):
+	config.addinivalue_line('markers', "slow: slow, timing dependent tests, skipped unless --slow is given")
+
+
+def pytest_collection_modifyitems(config, items):
+	if config.getoption('--slow'):
+		return
+	
+	skip = pytest.mark.skip(reason="slow; run with --slow")
+	
+	for item in items:
+		if 'slow' in item.keywords:
+			item.add_marker(skip)
+
+
+@pytest.fixture
+def sample():
+	"""Construct a `sample` decoder given flags and options."""
+	
+	return lambda *flags, **options: SampleDecoder('sample', *flags, **options)
+
+
+@pytest.fixture
+def execute(sample):
+	"""Translate sample source using the given flags and options, then execute it, returning the module namespace."""
+	
+	def execute(source, *flags, **options):
+		namespace = {'__name__': 'sample'}
+		exec(compile(sample(*flags, **options)(source), '<sample>', 'exec'), namespace)
+		return namespace
+	
+	return execute
@@ -0,0 +1,46 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from marrow.dsl.core import Buffer, Line
+
+
+SOURCE = '\n'.join(['import os', ''] + [
+		'def function_{0}(a):\n\tvalue = os.path.join(a, "{0}")\n\treturn value\nend\n'.format(i) for i in range(10)])
+
+
+class TestSpill(object):
+	def test_order(self):
+		buffer = Buffer([], spill=3)
+		buffer.append(*(Line('line {}'.format(i), i + 1, 0, {'code'}) for i in range(10)))
+		buffer.append('line 10')
+		
+		assert len(buffer.lines) == 3
+		assert buffer.spooled == 8
+		assert len(buffer) == 11
+		assert [line.line for line in buffer] == ['line {}'.format(i) for i in range(11)]
+		assert buffer.spool is None
+	
+	def test_attributes(self):
+		buffer = Buffer([], scope=1, spill=1)
+		buffer.append(Line('first', 1, 0), Line('second', 7, 2, {'code', 'def'}))
+		
+		line = list(buffer)[1]
+		
+		assert (line.number, line.scope, line.tag) == (7, 3, {'code', 'def'})
+	
+	def test_window(self):
+		buffer = Buffer([], spill=2)
+		buffer.append(*('line {}'.format(i) for i in range(6)))
+		
+		assert [line.line for line in buffer.window(4)] == ['line 0', 'line 1', 'line 2', 'line 3']
+		assert buffer.pull().line == 'line 0'
+		assert len(buffer) == 5
+	
+	def test_translation(self, sample, monkeypatch):
+		spilled = []
+		write = Buffer._write
+		monkeypatch.setattr(Buffer, '_write', lambda self, lines: write(self, spilled.append(1) or lines))
+		
+		assert sample(spill='2').translate(SOURCE) == sample().translate(SOURCE)
+		assert spilled
@@ -0,0 +1,61 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from marrow.dsl.core.cache import LRU
+
+
+SOURCE = '''def f(a):
+	x = a
+	if x:
+		x = a
+	return [x,
+		x]
+end
+'''
+
+
+class TestLRU(object):
+	def test_eviction(self):
+		cache = LRU(2)
+		cache.set('a', 1)
+		cache.set('b', 2)
+		cache.get('a')  # Now the most recently used.
+		cache.set('c', 3)
+		
+		assert 'a' in cache and 'c' in cache and 'b' not in cache
+		assert len(cache) == 2
+	
+	def test_default(self):
+		assert LRU(1).get('missing', 27) == 27
+
+
+class TestClassificationCache(object):
+	def test_disabled(self, sample):
+		assert sample().cache is None
+		assert sample(cache='0').cache is None
+		assert sample(cache=0).cache is None
+	
+	def test_size(self, sample):
+		decoder = sample(cache='64')
+		
+		assert decoder.cache == 64  # Even while empty.
+		assert str(decoder) == 'sample.cache-64'
+	
+	def test_output(self, sample):
+		assert sample(cache=64)(SOURCE) == sample()(SOURCE)
+	
+	def test_hits(self, sample):
+		decoder = sample(cache=64)
+		decoder(SOURCE)
+		decoder(SOURCE)
+		stats = decoder.stats
+		
+		assert stats.hits and stats.misses
+		assert stats.hits + stats.misses < stats.lines  # Lines of a multi-line logical line are not cached.
+	
+	def test_indentation(self, sample):
+		decoder = sample(cache=64)
+		decoder(SOURCE)
+		
+		assert decoder.stats.hits == 0  # `x = a` is repeated, but at differing indentation.
@@ -0,0 +1,91 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from marrow.dsl.core import Context
+
+
+NESTED = '''def outer(a):
+	def middle(b):
+		def inner(c):
+			return a + b + c
+		end
+		
+		return inner
+	end
+	
+	return middle
+end
+'''
+
+
+def context(decoder, source):
+	return Context(decoder, source, decoder._translators)
+
+
+class TestFlat(object):
+	def test_matches_stream(self, sample):
+		decoder = sample()
+		flat = [(str(line), line.number) for line in context(decoder, NESTED).flat]
+		stream = [(str(line), line.number) for line in context(decoder, NESTED).stream]
+		
+		assert flat == stream
+	
+	def test_nested_closures(self, execute):
+		assert execute(NESTED)['outer'](1)(2)(3) == 6
+	
+	def test_deep_nesting(self, execute):
+		depth = 50
+		lines = ['\t' * i + 'def f{}():'.format(i) for i in range(depth)]
+		lines.append('\t' * depth + 'return {}'.format(depth))
+		
+		for i in reversed(range(depth)):
+			if i < depth - 1:
+				lines.append('\t' * (i + 1) + 'return f{}()'.format(i + 1))
+			
+			lines.append('\t' * i + 'end')
+		
+		assert execute('\n'.join(lines))['f0']() == depth
+	
+	def test_unclosed_scopes(self, sample):
+		lines = list(context(sample('nomap'), 'def f():\n\treturn 1').flat)
+		
+		assert [str(line) for line in lines] == ['def f():', '\treturn 1']
+
+
+class TestLookahead(object):
+	SOURCE = "@first\n@second\n# comment\ndef f():\n\treturn 1\nend"
+	
+	def test_peek(self, sample):
+		ctx = context(sample(), self.SOURCE)
+		
+		assert ctx.peek().stripped == '@first'
+		assert [line.stripped for line in ctx.peek(2)] == ['@first', '@second']
+		assert len(ctx.peek(100)) == 6
+		assert ctx.pull().stripped == '@first'  # Nothing was consumed.
+	
+	def test_peek_classifies(self, sample):
+		ctx = context(sample(), self.SOURCE)
+		
+		assert 'decorator' in ctx.peek().tag
+	
+	def test_lookahead(self, sample):
+		ctx = context(sample(), self.SOURCE)
+		line = ctx.lookahead(lambda line: 'def' in line.tag)
+		
+		assert line.number == 4
+		assert ctx.peek().number == 1
+	
+	def test_lookahead_limit(self, sample):
+		ctx = context(sample(), self.SOURCE)
+		
+		assert ctx.lookahead(lambda line: 'def' in line.tag, 3) is None
+		assert ctx.lookahead(lambda line: 'def' in line.tag, 4).number == 4
+	
+	def test_exhausted(self, sample):
+		ctx = context(sample(), "")
+		ctx.pull()
+		
+		assert ctx.peek() is None
+		assert ctx.peek(3) == []
+		assert ctx.lookahead(lambda line: True) is None
@@ -0,0 +1,152 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from codecs import lookup
+
+import pytest
+
+from marrow.dsl.block.function import FunctionTransformer
+from marrow.dsl.block.module import ModuleTransformer
+from marrow.dsl.core import decoder as module
+from marrow.dsl.core import Classifier, Line
+from marrow.dsl.core.decoder import DecoderChain
+
+
+SOURCE = '''# A module.
+
+import os
+
+def f(a):
+	"""Documented."""
+	
+	return os.path.join(a, "b")
+end
+'''
+
+
+class TestDeclaration(object):
+	def test_options(self):
+		from conftest import SampleDecoder
+		
+		decoder = SampleDecoder.new('sample.nomap.cache-16.incremental_8')
+		
+		assert decoder.flags == {'nomap'}
+		assert decoder.options == [('cache', '16'), ('incremental', '8')]
+	
+	def test_numeric(self):
+		from conftest import SampleDecoder
+		
+		decoder = SampleDecoder.new('sample.lazy-5.dedupe-10.memory-1')
+		
+		assert (decoder.lazy, decoder.dedupe, decoder.memory) == (5, 10, 1)
+		assert str(decoder) == 'sample.dedupe-10.lazy-5.memory-1'
+		
+		decoder = SampleDecoder.new('sample.lazy-0.dedupe-0.memory-0')  # Zero disables, although a truthy string.
+		
+		assert (decoder.lazy, decoder.dedupe, decoder.memory) == (None, None, None)
+		assert str(decoder) == 'sample'
+	
+	def test_unknown(self):
+		from conftest import SampleDecoder
+		
+		with pytest.raises(TypeError) as info:
+			SampleDecoder.new('sample.bogus_value')
+		
+		assert 'flag' in str(info.value)
+	
+	def test_protected(self):
+		from conftest import SampleDecoder
+		
+		assert not SampleDecoder._option('_cache')
+		assert not SampleDecoder._option('stats')  # A read-only property.
+		assert SampleDecoder._option('spill')
+
+
+class TestIncrementalDecoder(object):
+	def test_chunked(self, sample):
+		decoder = sample()
+		incremental = decoder._codec_info.incrementaldecoder()
+		source = SOURCE.encode('utf8')
+		
+		parts = [incremental.decode(source[i:i + 7]) for i in range(0, len(source), 7)]
+		result = incremental.decode(b"", True)
+		
+		assert not any(parts)
+		assert result == decoder._decode(source)[0]
+	
+	def test_reset(self, sample):
+		incremental = sample()._codec_info.incrementaldecoder()
+		incremental.decode(b"def broken(")
+		incremental.reset()
+		
+		assert incremental.decode(b"x = 1\n", True) == "x = 1\n"
+	
+	def test_lookup(self):
+		info = lookup('sample.nomap')
+		
+		assert info.decode(b"x = 1")[0] == "x = 1\n"
+
+
+class Stage(Classifier):
+	"""Tag every line of code classified, as a later stage of a chain."""
+	
+	priority = -1000
+	
+	def classify(self, context, line):
+		if 'code' in line.tag:
+			line.tag.add('staged')
+
+
+@pytest.fixture
+def chain(monkeypatch):
+	"""Construct a chain of decoders from a `galfi` encoding name, resolving `sample` stages."""
+	
+	from conftest import SampleDecoder
+	
+	load = module.load
+	monkeypatch.setattr(module, 'load', lambda name, namespace: SampleDecoder if name == 'sample' else load(name, namespace))
+	
+	return DecoderChain.new
+
+
+class TestDecoderChain(object):
+	def test_name(self, chain):
+		decoder = chain('galfi.sample.nomap.sample')
+		
+		assert str(decoder) == 'galfi.sample.nomap.sample'
+		assert decoder.flags == set()
+		assert decoder.ns is None
+	
+	def test_single_mapping(self, chain):
+		output, mapping = chain('galfi.sample.sample').translate(SOURCE)
+		
+		assert output.count('__gzmapping__') == 1
+		assert output.split() == chain('galfi.sample').translate(SOURCE)[0].split()  # Blank lines are re-indented.
+		assert mapping[:9] == [1, 2, 3, 4, 5, 6, 7, 8, 10]
+	
+	def test_restage(self):
+		line = DecoderChain.restage(Line('x = [', 4, 1, {'code', 'def', '_end'}))
+		
+		assert str(line) == '\tx = ['
+		assert line.number == 4
+		assert line.scope is None
+		assert line.tag == {'code', 'def'}
+	
+	def test_later_classifiers(self, sample):
+		from conftest import Sample, SampleDecoder
+		
+		class StageDecoder(SampleDecoder):
+			__slots__ = ()
+			
+			def _load(self, namespace):
+				return [Sample, Stage, ModuleTransformer, FunctionTransformer]
+		
+		lines = list(DecoderChain(sample('nomap'), StageDecoder('sample', 'nomap')).iterate(SOURCE))
+		
+		assert any('staged' in line.tag for line in lines)
+		assert not any('staged' in line.tag for line in sample('nomap').iterate(SOURCE))
+	
+	def test_unknown_encoding(self):
+		assert module.galfi('not-a-dsl') is None
+		assert lookup('sample.nomap')  # Consulted after galfi declines.
@@ -0,0 +1,90 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import pytest
+
+from marrow.dsl.core.incremental import BlockCache
+
+
+SOURCE = '''import os
+
+def first(a):
+	return os.path.join(a, "first")
+end
+
+def second(a):
+	def inner():
+		return a
+	end
+	
+	return inner()
+end
+'''
+
+
+@pytest.fixture
+def recalled(monkeypatch):
+	"""Count the blocks recalled from block caches."""
+	
+	counts = []
+	original = BlockCache.recall
+	
+	def recall(self, flags, source, start):
+		result = original(self, flags, source, start)
+		counts.append(result is not None)
+		return result
+	
+	monkeypatch.setattr(BlockCache, 'recall', recall)
+	
+	return counts
+
+
+class TestIncremental(object):
+	def test_disabled(self, sample):
+		assert sample().incremental is None
+		assert sample(incremental='0').incremental is None
+		assert sample(incremental='8').incremental == 8
+	
+	def test_retained(self, sample, recalled):
+		decoder = sample(incremental=8)
+		
+		assert decoder(SOURCE) == sample()(SOURCE)
+		assert len(decoder._blocks) == 2  # Nested closures are retained as part of their enclosing function.
+		assert recalled == [False, False]
+		
+		assert decoder(SOURCE) == sample()(SOURCE)
+		assert recalled[2:] == [True, True]
+	
+	def test_edited(self, sample, recalled):
+		decoder = sample(incremental=8)
+		decoder(SOURCE)
+		
+		edited = SOURCE.replace('"first"', '"changed"').replace('import os\n', 'import os\nimport sys\n\nx = 1\n')
+		
+		assert decoder(edited) == sample()(edited)  # The second function moved; its line numbers must follow.
+		assert recalled[2:] == [False, True]
+	
+	def test_flags(self, sample, recalled):
+		decoder = sample('nomap', incremental=8)
+		decoder(SOURCE)
+		decoder._flags = set()  # Blocks translated under other flags are not recalled.
+		
+		assert decoder(SOURCE) == sample()(SOURCE)
+		assert not any(recalled)
+	
+	def test_unclosed(self, sample):
+		decoder = sample(incremental=8)
+		source = SOURCE + '\ndef third():\n\treturn 3\n'
+		
+		assert decoder(source) == sample()(source)
+		assert len(decoder._blocks) == 2
+	
+	def test_instrumented(self, sample, recalled):
+		decoder = sample('instrument', incremental=8)
+		decoder(SOURCE)
+		
+		edited = SOURCE.replace('import os\n', 'import os\nimport sys\n\n')
+		
+		assert decoder(edited) == sample('instrument')(edited)  # Slot names follow the moved declarations.
+		assert not any(recalled)
@@ -0,0 +1,75 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from marrow.dsl.core import Context, Line, LogicalLine
+
+
+def logical(*texts):
+	"""Append the given physical lines to a new logical line, returning it and whether each was continued."""
+	
+	result = LogicalLine()
+	continued = [result.append(Line(text, i + 1)) for i, text in enumerate(texts)]
+	
+	return result, continued
+
+
+class TestLogicalLine(object):
+	def test_single(self):
+		line, continued = logical('x = 1')
+		
+		assert continued == [False]
+		assert line.complete
+		assert line.span == (1, 1)
+	
+	def test_brackets(self):
+		line, continued = logical('x = call(a,', '[b, c],', ')')
+		
+		assert continued == [True, True, False]
+		assert line.span == (1, 3)
+		assert line.text == 'x = call(a, [b, c], )'
+	
+	def test_triple_quoted(self):
+		line, continued = logical('"""Open (', 'still [open', '"""')
+		
+		assert continued == [True, True, False]
+	
+	def test_quoted_brackets(self):
+		line, continued = logical('x = "(" + \'[\'  # {')
+		
+		assert continued == [False]
+		assert line.depth == 0
+	
+	def test_escaped_quote(self):
+		line, continued = logical('x = "\\"("')
+		
+		assert continued == [False]
+	
+	def test_backslash(self):
+		line, continued = logical('x = 1 + \\', '2')
+		
+		assert continued == [True, False]
+		assert line.text == 'x = 1 + 2'
+	
+	def test_backslash_in_comment(self):
+		line, continued = logical('x = 1  # \\')
+		
+		assert continued == [False]
+
+
+class TestTracking(object):
+	def test_tags(self, sample):
+		decoder = sample()
+		context = Context(decoder, 'x = [\n\t1,\n]\ny = 2', decoder._translators)
+		lines = list(context)
+		
+		assert 'continued' in lines[0].tag and 'continuation' not in lines[0].tag
+		assert {'continued', 'continuation'} <= lines[1].tag
+		assert 'continuation' in lines[2].tag and 'continued' not in lines[2].tag
+		assert not lines[3].tag & {'continued', 'continuation'}
+		assert lines[0].logical is lines[2].logical is not lines[3].logical
+	
+	def test_declaration(self, execute):
+		namespace = execute('def f(a,\n\t\tb=2):\n\treturn a + b\nend')
+		
+		assert namespace['f'](1) == 3
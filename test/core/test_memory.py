@@ -0,0 +1,64 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import tracemalloc
+
+import pytest
+
+from marrow.dsl.core import Line
+from marrow.dsl.core.memory import Memory, tracing
+
+
+SOURCE = '\n'.join('def function_{0}(a):\n\treturn a + {0}\nend\n'.format(i) for i in range(20))
+
+pytestmark = pytest.mark.skipif(not hasattr(tracemalloc, 'reset_peak'), reason="requires Python 3.9")
+
+
+class TestMemory(object):
+	def test_translation(self, sample):
+		decoder = sample('nomap', memory='1')
+		output = decoder.translate(SOURCE)
+		memory = decoder.stats.memory
+		
+		assert output == sample('nomap').translate(SOURCE)
+		assert [stage.name for stage in memory.stages] == ['prepare', 'transform', 'classify', 'render']
+		assert memory.peak > 0
+		assert memory.lines > 0
+		assert not tracemalloc.is_tracing()
+	
+	def test_disabled(self, sample):
+		decoder = sample('nomap', memory='0')
+		decoder.translate(SOURCE)
+		
+		assert decoder.stats.memory is None
+	
+	def test_lines(self):
+		with Memory() as memory:
+			with memory.stage('create'):
+				lines = [Line('line') for i in range(100)]
+		
+		assert memory.lines >= 100
+		del lines
+	
+	def test_nested(self):
+		with Memory():
+			with Memory():
+				pass
+			
+			assert tracemalloc.is_tracing()
+			assert tracing.users == 1
+		
+		assert not tracemalloc.is_tracing()
+		assert '__del__' not in Line.__dict__
+	
+	def test_already_tracing(self):
+		tracemalloc.start()
+		
+		try:
+			with Memory():
+				pass
+			
+			assert tracemalloc.is_tracing()
+		finally:
+			tracemalloc.stop()
@@ -0,0 +1,60 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import pytest
+
+from marrow.dsl.core import Line, prescan as module
+from marrow.dsl.core.prescan import BLANK, COMMENT, CONTINUED, prescan
+
+
+SOURCE = '\n'.join((
+		'def f(a):',
+		'\t# A comment.',
+		'',
+		'  \t ',
+		'\tx = 1 + \\',
+		'\t\t2',
+		'\ty = "\\\\"  \\\\',
+		'\u00a0\u3000',  # Non-ASCII whitespace alone.
+		'\u2003value \\\u00a0',  # Non-ASCII indentation, and a continuation followed by non-ASCII whitespace.
+		'\x0c\\',
+		'end\r',
+		'',
+	))
+
+
+@pytest.fixture(params=['regex', 'numpy'])
+def implementation(request, monkeypatch):
+	if request.param == 'regex':
+		monkeypatch.setattr(module, 'numpy', None)
+	elif module.numpy is None:
+		pytest.skip("NumPy is not installed.")
+	
+	return request.param
+
+
+class TestPrescan(object):
+	def test_kinds(self, implementation):
+		assert prescan(SOURCE).kind == [0, COMMENT, BLANK, BLANK, CONTINUED, 0, 0, BLANK, CONTINUED, CONTINUED, 0,
+				BLANK]
+	
+	def test_indent(self, implementation):
+		assert prescan(SOURCE).indent == [0, 1, 0, 4, 1, 2, 1, 2, 1, 1, 0, 0]
+	
+	def test_agrees_with_lines(self, implementation):
+		result = prescan(SOURCE)
+		
+		for i, text in enumerate(SOURCE.split('\n')):
+			line = Line(text)
+			
+			assert bool(result.kind[i] & BLANK) == (not line.stripped)
+			
+			if line.stripped:
+				assert result.indent[i] == len(text) - len(text.lstrip())
+	
+	def test_empty(self, implementation):
+		assert prescan('') == ([0], [BLANK])
+	
+	def test_whitespace(self, implementation):
+		assert prescan(' \n\t\t') == ([1, 2], [BLANK, BLANK])
@@ -0,0 +1,28 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import pytest
+
+from marrow.dsl.core import Line, Template
+
+
+class TestTemplate(object):
+	def test_call(self):
+		assert Template('from {} import {name}')('os', name='path') == 'from os import path'
+	
+	def test_render(self):
+		line = Line('trigger', 12, 2, {'code', '_private'})
+		rendered = Template('value = {!r}').render(line, 'text')
+		
+		assert rendered.line == "value = 'text'"
+		assert (rendered.number, rendered.scope, rendered.tag) == (12, 2, {'code'})
+	
+	def test_line_format(self):
+		line = Line('return {}', 3, 1).format('value')
+		
+		assert (str(line), line.number) == ('\treturn value', 3)
+	
+	def test_not_template(self):
+		with pytest.raises(ValueError):
+			Line('return value').format()
@@ -0,0 +1,62 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+from marrow.dsl import aio
+from marrow.dsl.aio import Translator, translate
+
+
+SOURCE = "def f():\n\treturn 1\nend\n"
+
+
+class TestTranslate(object):
+	def test_translate(self, sample):
+		async def run():
+			return await translate(SOURCE, 'sample.nomap')
+		
+		assert asyncio.run(run()) == sample('nomap')._decode(SOURCE.encode('utf8'))[0]
+	
+	def test_coalesced(self, monkeypatch):
+		release = Event()
+		calls = []
+		
+		def blocking(source, encoding):
+			calls.append(encoding)
+			release.wait(5)
+			return "translated"
+		
+		monkeypatch.setattr(aio, '_translate', blocking)
+		translator = Translator(ThreadPoolExecutor(4))
+		
+		async def run():
+			first = translator.translate(SOURCE, 'sample')
+			second = translator.translate(SOURCE.encode('utf8'), 'sample')
+			other = translator.translate(SOURCE, 'sample.nomap')
+			
+			assert len(translator.pending) == 2
+			
+			release.set()
+			return await asyncio.gather(first, second, other)
+		
+		assert asyncio.run(run()) == ["translated"] * 3
+		assert sorted(calls) == ['sample', 'sample.nomap']
+		assert not translator.pending
+	
+	def test_cancellation(self, monkeypatch):
+		release = Event()
+		monkeypatch.setattr(aio, '_translate', lambda source, encoding: release.wait(5) and "translated")
+		translator = Translator(ThreadPoolExecutor(1))
+		
+		async def run():
+			first = asyncio.ensure_future(translator.translate(SOURCE, 'sample'))
+			second = translator.translate(SOURCE, 'sample')
+			await asyncio.sleep(0)
+			first.cancel()
+			release.set()
+			return await second
+		
+		assert asyncio.run(run()) == "translated"
@@ -0,0 +1,58 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import os
+
+from marrow.dsl.compiler import Compiler
+from marrow.dsl.core.decoder import decoder
+
+
+SOURCE = '''def greet(name):
+	return "Hello " + name
+end
+'''
+
+
+class TestCompiler(object):
+	def test_load(self):
+		module = Compiler().load(SOURCE, 'sample')
+		
+		assert module.greet("world") == "Hello world"
+	
+	def test_cached(self):
+		compiler = Compiler()
+		
+		assert compiler.compile(SOURCE, 'sample') is compiler.compile(SOURCE.encode('utf8'), 'sample')
+		assert len(compiler.cache) == 1
+	
+	def test_encodings_differ(self):
+		compiler = Compiler()
+		
+		assert compiler.compile(SOURCE, 'sample') is not compiler.compile(SOURCE, 'sample.nomap')
+	
+	def test_identity(self):
+		identity = Compiler.identify('sample.nomap.cache-16')
+		
+		assert identity[0] == ['nomap']
+		assert identity[1] == [('cache', '16')]
+		assert Compiler.identify('not-a-dsl') is None
+	
+	def test_versions(self, monkeypatch):
+		instance = decoder('sample.nomap')
+		before = Compiler.digest(SOURCE.encode('utf8'), 'sample.nomap', Compiler.identify('sample.nomap'))
+		
+		monkeypatch.setitem(instance._versions, instance._translators[0], 'sample 2.0')
+		after = Compiler.digest(SOURCE.encode('utf8'), 'sample.nomap', Compiler.identify('sample.nomap'))
+		
+		assert before != after
+	
+	def test_directory(self, tmpdir):
+		code = Compiler(directory=str(tmpdir)).compile(SOURCE, 'sample')
+		
+		assert len(os.listdir(str(tmpdir))) == 1
+		
+		compiler = Compiler(directory=str(tmpdir))
+		loaded = compiler.compile(SOURCE, 'sample')
+		
+		assert loaded is not code and loaded == code
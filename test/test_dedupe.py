@@ -0,0 +1,55 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from marrow.dsl.dedupe import __dedupe__
+from marrow.dsl.profiler import Sampler
+
+
+SOURCE = '''def capture(a):
+	value = a + 1
+	value += 1
+	return __import__('sys')._getframe()
+end
+
+def short():
+	return 1
+end
+'''
+
+
+class TestDedupe(object):
+	def test_stub(self, sample):
+		output = sample('nomap', dedupe=3).translate(SOURCE)[0]
+		
+		assert output.count('@__dedupe__(') == 1
+		assert 'value += 1' not in output
+		assert 'return 1' in output
+	
+	def test_disabled(self, sample):
+		assert '__dedupe__' not in sample('nomap', dedupe='0').translate(SOURCE)[0]
+	
+	def test_shared(self, execute):
+		first = execute(SOURCE, dedupe=3)['capture']
+		second = execute(SOURCE, dedupe=3)['capture']
+		
+		assert first is not second
+		assert first.__code__ is second.__code__
+		assert first.__globals__ is not second.__globals__
+		assert first(1).f_locals['value'] == 3
+	
+	def test_table(self, execute):
+		hits = __dedupe__.hits
+		execute(SOURCE, dedupe=3)
+		execute(SOURCE, dedupe=3)
+		
+		assert __dedupe__.hits > hits
+	
+	def test_profiler_unmapped(self, execute):
+		frame = execute(SOURCE, dedupe=3)['capture'](1)
+		filename, name, line, mapped = Sampler().describe(frame)
+		
+		assert filename.startswith('<marrow.dsl.dedupe:')
+		assert name == 'capture'
+		assert line == 4  # Relative to the shared source, beginning with the declaration.
+		assert not mapped
@@ -0,0 +1,124 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import os
+import sys
+import traceback
+
+import pytest
+
+from marrow.dsl.lazy import Import, __lazy__
+
+
+SOURCE = '''import functools
+
+def doubled(fn):
+	@functools.wraps(fn)
+	def wrapper(*args, **kw):
+		return fn(*args, **kw) * 2
+	end
+	
+	return wrapper
+end
+
+@doubled
+def total(a, b=2, *args, c=0, **kw):
+	"""Documented."""
+	
+	value = a + b
+	value += sum(args) + c
+	value += len(kw)
+	
+	return value
+end
+
+def failing(a):
+	value = a + 1
+	value += 1
+	raise ValueError(value)
+end
+'''
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 3), reason="requires Python 3.3")
+
+
+def lineno(fn, *args):
+	"""The line number within the generated module at which the function raises."""
+	
+	with pytest.raises(ValueError) as info:
+		fn(*args)
+	
+	return traceback.extract_tb(info.tb)[-1].lineno
+
+
+class TestLazy(object):
+	def test_stub(self, sample):
+		output = sample('nomap', lazy='5').translate(SOURCE)[0]
+		
+		assert '@doubled\n@__lazy__.stub(' in output
+	
+	def test_disabled(self, sample):
+		assert '__lazy__' not in sample('nomap', lazy='0').translate(SOURCE)[0]
+	
+	def test_wrapped(self, execute):
+		namespace = execute(SOURCE, 'nomap', lazy='5')
+		total = namespace['total']
+		
+		assert total(1, 2, 3, c=4, d=5) == 22
+		assert total(1) == 6
+		assert total.__doc__ == "Documented."
+		assert not hasattr(total.__wrapped__, '__lazy__')  # Loaded.
+	
+	def test_line_numbers(self, sample, execute):
+		output = sample('nomap', lazy='3').translate(SOURCE)[0].split('\n')
+		failing = execute(SOURCE, 'nomap', lazy='3')['failing']
+		
+		assert hasattr(failing, '__lazy__')
+		assert lineno(failing, 1) == output.index('def failing(a):') + 4  # Padded in place of the body.
+	
+	def test_modules(self, sample):
+		namespaces = []
+		
+		for name in 'ab':
+			source = 'def render(a):\n\tvalue = a + 1\n\treturn ({!r}, value)\nend\n'.format(name.upper())
+			namespace = {'__name__': name}
+			exec(compile(sample('nomap', lazy='2')(source), name + '.py', 'exec'), namespace)
+			namespaces.append(namespace)
+		
+		assert namespaces[0]['render'].__code__ == namespaces[1]['render'].__code__  # Stubs compare equal.
+		assert namespaces[0]['render'](1) == ('A', 2)
+		assert namespaces[1]['render'](1) == ('B', 2)
+
+
+class TestImports(object):
+	def test_call(self):
+		namespace = {}
+		__lazy__.imports(namespace, 'os.path', 'join', 'exists as present')
+		
+		assert isinstance(namespace['join'], Import)
+		assert namespace['join']('a', 'b') == os.path.join('a', 'b')
+		assert namespace['present'].__name__ == 'exists'
+		assert not isinstance(namespace['present'], Import)  # Replaced on attribute access.
+	
+	def test_submodule(self):
+		namespace = {}
+		__lazy__.imports(namespace, 'xml', 'dom')
+		
+		assert namespace['dom'].__name__ == 'xml.dom'
+	
+	def test_captured(self):
+		namespace = {}
+		__lazy__.imports(namespace, 'collections', 'OrderedDict')
+		captured = namespace['OrderedDict']
+		
+		assert captured() == {}
+		assert namespace['OrderedDict'] is not captured  # Captured references remain the proxy.
+		assert isinstance(captured, Import)
+	
+	def test_translation(self, sample, execute):
+		source = 'def f(a):\n\treturn a + 1\nend\n'
+		output = sample('nomap', 'instrument', imports='lazy').translate(source)[0]
+		
+		assert "__lazy__.imports(globals(), 'marrow.dsl.metrics', 'registry as __metrics__')" in output
+		assert execute(source, 'nomap', 'instrument', imports='lazy')['f'](1) == 2
@@ -0,0 +1,59 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import sys
+from codecs import lookup
+
+import pytest
+
+from marrow.dsl.manifest import describe, digest, manifest
+
+
+SOURCE = b'''def greet(name):
+	return "Hello " + name
+end
+'''
+
+
+class TestDescribe(object):
+	def test_entry(self):
+		entry, output = describe(SOURCE, 'sample.nomap.cache-16')
+		
+		assert output == lookup('sample.nomap.cache-16').decode(SOURCE)[0]
+		assert entry['input'] == digest(SOURCE)
+		assert entry['output'] == digest(output)
+		assert entry['encoding'] == 'sample.nomap.cache-16'
+		assert entry['flags'] == ['nomap']
+		assert entry['options'] == [['cache', '16']]
+		assert entry['python'] == list(sys.version_info[:2])
+		assert entry['debug'] is __debug__
+	
+	def test_deterministic(self):
+		assert describe(SOURCE, 'sample.nomap') == describe(SOURCE, 'sample.nomap')
+	
+	def test_key(self):
+		keys = {describe(SOURCE, name)[0]['key'] for name in ('sample', 'sample.nomap', 'sample.cache-16')}
+		
+		assert len(keys) == 3
+	
+	def test_unknown(self):
+		with pytest.raises(LookupError):
+			describe(SOURCE, 'utf-8')
+
+
+class TestManifest(object):
+	def test_directory(self, tmpdir):
+		tmpdir.join('dsl.py').write_binary(b'# encoding: sample.nomap\n' + SOURCE)
+		tmpdir.join('plain.py').write_binary(b'value = 27\n')
+		
+		entries = manifest([str(tmpdir)])
+		
+		assert list(entries) == [str(tmpdir.join('dsl.py'))]
+		assert entries[str(tmpdir.join('dsl.py'))]['encoding'] == 'sample.nomap'
+	
+	def test_undeclared(self, tmpdir):
+		tmpdir.join('plain.py').write_binary(b'value = 27\n')
+		
+		with pytest.raises(LookupError):
+			manifest([str(tmpdir.join('plain.py'))])
@@ -0,0 +1,65 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from marrow.dsl.metrics import Registry, registry
+
+
+SOURCE = '''def passthrough(fn):
+	return fn
+end
+
+@passthrough
+def decorated(a):
+	return a + 1
+end
+
+def plain(a):
+	return a * 2
+end
+
+def generate(n):
+	yield n
+	yield n + 1
+end
+'''
+
+
+class TestInstrument(object):
+	def test_calls(self, execute):
+		registry.reset()
+		namespace = execute(SOURCE, 'nomap', 'instrument')
+		
+		assert namespace['decorated'](1) == 2
+		assert namespace['decorated'](2) == 3
+		assert namespace['plain'](2) == 4
+		assert list(namespace['generate'](3)) == [3, 4]
+		
+		calls = {name: (line, count) for module, name, line, count, time in registry if module == 'sample'}
+		
+		assert calls['decorated'] == (6, 2)
+		assert calls['plain'] == (10, 1)
+		assert calls['generate'] == (14, 1)
+	
+	def test_uninstrumented(self, sample):
+		assert '__metrics__' not in sample('nomap').translate(SOURCE)[0]
+
+
+class TestRegistry(object):
+	def test_slot(self):
+		instance = Registry()
+		table, first = instance.slot('module', 'first', 1)
+		same, second = instance.slot('module', 'second', 5)
+		
+		assert table is same
+		assert (first, second) == (0, 1)
+		assert instance.slot('module', 'first', 1) == (table, 0)  # Reloading retains the slot.
+	
+	def test_reset(self):
+		instance = Registry()
+		table, index = instance.slot('module', 'function', 1)
+		table.counts[index] += 3
+		table.times[index] += 0.5
+		instance.reset()
+		
+		assert list(instance) == [('module', 'function', 1, 0, 0.0)]
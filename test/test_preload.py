@@ -0,0 +1,58 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import sys
+
+import pytest
+
+from marrow.dsl.preload import encoding, preload
+
+
+MODULE = '''# encoding: sample.nomap
+
+def greet(name):
+	return "Hello " + name
+end
+'''
+
+
+@pytest.fixture
+def package(tmpdir, monkeypatch):
+	"""A package of DSL and plain Python modules, importable as `preloaded`."""
+	
+	root = tmpdir.mkdir('preloaded')
+	root.join('__init__.py').write('')
+	root.join('dsl.py').write(MODULE)
+	root.join('plain.py').write('value = 27\n')
+	root.join('broken.py').write('# encoding: sample.nomap\n\ndef broken(:\nend\n')
+	root.mkdir('nested').join('__init__.py').write('')
+	root.join('nested', 'inner.py').write(MODULE)
+	
+	monkeypatch.syspath_prepend(str(tmpdir))
+	
+	yield root
+	
+	for name in list(sys.modules):
+		if name.partition('.')[0] == 'preloaded':
+			del sys.modules[name]
+
+
+class TestPreload(object):
+	def test_encoding(self, package):
+		assert encoding(str(package.join('dsl.py'))) == 'sample.nomap'
+		assert encoding(str(package.join('plain.py'))) is None
+		assert encoding(str(package.join('missing.py'))) is None
+	
+	def test_preload(self, package):
+		result = preload('preloaded', freeze=False)
+		
+		assert sorted(result.modules) == ['preloaded.dsl', 'preloaded.nested.inner']
+		assert list(result.failed) == ['preloaded.broken']
+		assert result.frozen is None
+		assert 'preloaded.plain' not in sys.modules
+		assert sys.modules['preloaded.dsl'].greet("World") == "Hello World"
+	
+	def test_arguments(self):
+		with pytest.raises(TypeError):
+			preload('preloaded', frozen=False)
@@ -0,0 +1,52 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from marrow.dsl.core.util import redelta_decode
+
+
+SOURCE = '''# A module comment.
+"""Module docstring."""
+
+import os
+
+def join(a):
+	"""Documented."""
+	
+	# A comment.
+	return os.path.join(a, "b")
+end
+
+def one():
+	return 1
+end
+'''
+
+
+class TestProduction(object):
+	def test_trimmed(self, sample):
+		output, mapping = sample('production', 'nomap').translate(SOURCE)
+		
+		assert output == 'import os\ndef join(a):\n\treturn os.path.join(a, "b")\ndef one():\n\treturn 1'
+		assert mapping == [4, 6, 10, 13, 14]
+	
+	def test_mapping(self, sample):
+		output, mapping = sample('production').translate(SOURCE)
+		lines = output.split('\n')
+		
+		assert len(lines) == 6
+		assert lines[-1].startswith('__gzmapping__ = b"')
+		assert redelta_decode(lines[-1][18:-1]) == [4, 6, 10, 13, 14]
+	
+	def test_execution(self, execute):
+		namespace = execute(SOURCE, 'production')
+		
+		assert namespace['join']('a') == execute(SOURCE)['join']('a')
+		assert namespace['join'].__doc__ is None
+		assert namespace['one']() == 1
+	
+	def test_development(self, sample):
+		output = sample('nomap').translate(SOURCE)[0]
+		
+		assert '"""Documented."""' in output
+		assert '# A comment.' in output
@@ -0,0 +1,84 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import threading
+from collections import Counter
+
+from marrow.dsl.profiler import Sampler
+
+
+SOURCE = '''def first():
+	return 1
+end
+
+def capture():
+	return __import__('sys')._getframe()
+end
+
+def block(started, event):
+	started.set()
+	event.wait()
+end
+'''
+
+
+class TestSampler(object):
+	def test_describe(self, execute):
+		frame = execute(SOURCE)['capture']()
+		
+		assert Sampler().describe(frame) == ('<sample>', 'capture', 6, True)
+	
+	def test_unmapped(self, execute):
+		frame = execute(SOURCE, 'nomap')['capture']()
+		
+		assert Sampler().describe(frame) == ('<sample>', 'capture', 5, False)
+	
+	def test_modules(self, sample):
+		frames = []
+		
+		for name, prefix in (('a', ''), ('b', '\n\n')):  # Blank lines are dropped; only the mapping differs.
+			namespace = {'__name__': name}
+			exec(compile(sample('production')(prefix + SOURCE), name + '.py', 'exec'), namespace)
+			frames.append(namespace['capture']())
+		
+		sampler = Sampler()
+		
+		assert frames[0].f_code == frames[1].f_code
+		assert sampler.describe(frames[0]) == ('a.py', 'capture', 6, True)
+		assert sampler.describe(frames[1]) == ('b.py', 'capture', 8, True)
+	
+	def test_invalid_mapping(self):
+		assert Sampler().mapping('not a mapping') == []
+	
+	def test_sample(self, execute):
+		namespace = execute(SOURCE)
+		started, event = threading.Event(), threading.Event()
+		thread = threading.Thread(target=namespace['block'], args=(started, event))
+		thread.start()
+		
+		try:
+			started.wait()
+			sampler = Sampler()
+			sampler.sample(threading.current_thread().ident)
+		finally:
+			event.set()
+			thread.join()
+		
+		stacks = [stack for stack in sampler.samples if ('<sample>', 'block', 11, True) in stack]
+		
+		assert len(stacks) == 1
+	
+	def test_report(self):
+		sampler = Sampler()
+		outer = ('<sample>', 'outer', 3, True)
+		inner = ('<sample>', 'inner', 8, True)
+		other = ('lib.py', 'helper', 20, False)
+		sampler.samples = Counter({(outer, inner, other): 3, (outer, ): 1})
+		
+		own, total = sampler.hot(lambda frame: frame[1])
+		
+		assert own == Counter({'inner': 3, 'outer': 1})
+		assert total == Counter({'outer': 4, 'inner': 3})
+		assert next(sampler.collapsed()) == '<sample>:outer:3;<sample>:inner:8;lib.py:helper:20 3'
+		assert list(sampler.report())[0] == "4 samples at 5.0ms intervals."
@@ -0,0 +1,208 @@
+# encoding: utf-8
+
+"""Guard against translation cost growing faster than the size of its input.
+
+Inputs are generated at doubling sizes, or nesting depths, and the growth in both the time taken and the memory
+allocated to process them is fit to a power law. A fitted exponent beyond linear, with allowance for measurement
+noise, fails.
+
+Growth is measured relative to the length of the input in characters. Deeper nesting necessarily adds indentation to
+every line within, in the input and output both, thus inputs nested to depth `d` have `O(d²)` characters; re-scoping
+nested output through each enclosing buffer is linear in this.
+
+These tests take tens of seconds and depend upon timing, so are skipped unless pytest is given the `--slow` option.
+"""
+
+from __future__ import division, unicode_literals
+
+import gc
+import math
+import time
+import tracemalloc
+
+import pytest
+
+from conftest import SampleDecoder
+from marrow.dsl.block.common import fetch_docstring
+from marrow.dsl.core import Buffer, Context, Line
+from marrow.dsl.core.util import chunk
+
+
+TIME = 1.3  # The greatest acceptable fitted exponent of growth in time taken; timing is noisy.
+MEMORY = 1.15  # The greatest acceptable fitted exponent of growth in peak memory allocated.
+DOUBLINGS = 5  # The number of sizes measured, each double the last.
+REPEAT = 5  # Timings are the fastest of this many runs.
+
+pytestmark = pytest.mark.slow
+
+
+def functions(count):
+	"""Generate a module declaring `count` decorated functions, each with a docstring."""
+	
+	parts = ['"""A generated module."""', '', 'import os', '']
+	
+	for i in range(count):
+		parts.extend((
+				'@decorator',
+				'def function_{}(a, b=None):'.format(i),
+				'\t"""A function."""',
+				'\t',
+				'\tvalue = os.path.join(a, b or "")',
+				'\treturn value',
+				'end',
+				'',
+			))
+	
+	return '\n'.join(parts)
+
+
+def nested(depth):
+	"""Generate a module declaring a function containing closures nested to the given depth."""
+	
+	parts = []
+	
+	for i in range(depth):
+		parts.append('\t' * i + 'def function_{}(a):'.format(i))
+		parts.append('\t' * (i + 1) + 'value = a + {}'.format(i))
+	
+	for i in reversed(range(depth)):
+		parts.append('\t' * (i + 1) + 'return value')
+		parts.append('\t' * i + 'end')
+	
+	return '\n'.join(parts)
+
+
+def docstring(count):
+	"""Generate a function body opening with a docstring of `count` lines."""
+	
+	return '\n'.join(['"""Documentation.'] + ['Line {} of the docstring.'.format(i) for i in range(count)] +
+			['"""', 'return'])
+
+
+def interpolated(count):
+	"""Generate a line of text interpolating `count` expressions."""
+	
+	return Line(''.join('Text ${{value[{0}]}} and #{{markup({0}, {{"key": {0}}})}}. '.format(i) for i in range(count)))
+
+
+def measure(prepare, run):
+	"""The fastest time, in seconds, and the peak memory allocated, in bytes, to run with a freshly prepared value."""
+	
+	best = None
+	
+	for i in range(REPEAT):
+		value = prepare()
+		gc.collect()
+		start = time.perf_counter()
+		run(value)
+		duration = time.perf_counter() - start
+		best = duration if best is None else min(best, duration)
+	
+	value = prepare()
+	gc.collect()
+	tracemalloc.start()
+	
+	try:
+		run(value)
+		peak = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+	
+	return best, peak
+
+
+def exponent(sizes, values):
+	"""The least-squares fit of the exponent `k` in `value = c * size ** k`."""
+	
+	xs = [math.log(i) for i in sizes]
+	ys = [math.log(max(i, 1e-9)) for i in values]
+	mx = sum(xs) / len(xs)
+	my = sum(ys) / len(ys)
+	
+	return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+
+
+def growth(generate, base, prepare, run):
+	"""Measure at doubling scales, returning the fitted exponents of growth in time and memory relative to size."""
+	
+	sizes, times, peaks = [], [], []
+	
+	for i in range(DOUBLINGS):
+		source = generate(base * 2 ** i)
+		duration, peak = measure(lambda: prepare(source), run)
+		sizes.append(len(source.line if isinstance(source, Line) else source))
+		times.append(duration)
+		peaks.append(peak)
+	
+	return exponent(sizes, times), exponent(sizes, peaks)
+
+
+def check(generate, base, prepare, run):
+	duration, memory = growth(generate, base, prepare, run)
+	
+	assert duration < TIME, "Time grows as size ** {:.2f}".format(duration)
+	assert memory < MEMORY, "Memory grows as size ** {:.2f}".format(memory)
+
+
+def stream(source):
+	decoder = SampleDecoder('sample')
+	return Context(decoder, source, decoder._translators)
+
+
+def consume(lines):
+	for line in lines:
+		pass
+
+
+class TestTranslation(object):
+	def test_functions(self):
+		check(functions, 50, lambda source: (SampleDecoder('sample'), source), lambda args: args[0].translate(args[1]))
+	
+	def test_nesting(self):
+		check(nested, 8, lambda source: (SampleDecoder('sample'), source), lambda args: args[0].translate(args[1]))
+	
+	def test_incremental_decoder(self):
+		def prepare(source):
+			decoder = SampleDecoder('sample')._codec_info.incrementaldecoder()
+			source = source.encode('utf8')
+			return decoder, [source[i:i + 64] for i in range(0, len(source), 64)]
+		
+		def run(args):
+			decoder, chunks = args
+			
+			for part in chunks:
+				decoder.decode(part)
+			
+			decoder.decode(b"", True)
+		
+		check(functions, 50, prepare, run)
+
+
+class TestStream(object):
+	def test_functions(self):
+		check(functions, 50, stream, lambda context: consume(context.stream))
+	
+	def test_nesting(self):
+		check(nested, 8, stream, lambda context: consume(context.stream))
+
+
+class TestFlat(object):
+	def test_functions(self):
+		check(functions, 50, stream, lambda context: consume(context.flat))
+	
+	def test_nesting(self):
+		check(nested, 8, stream, lambda context: consume(context.flat))
+
+
+class TestDocstring(object):
+	def test_lines(self):
+		def run(context):
+			fetch_docstring(context, Buffer([]))
+			assert context.input.peek().stripped == 'return'
+		
+		check(docstring, 250, stream, run)
+
+
+class TestChunk(object):
+	def test_interpolations(self):
+		check(interpolated, 50, lambda line: line, lambda line: consume(chunk(line)))
@@ -0,0 +1,92 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import os
+import socket
+import stat
+from threading import Thread
+
+import pytest
+
+from marrow.dsl import serve
+from marrow.dsl.serve import Client, TranslationServer, default_path, translate_locally
+
+
+SOURCE = 'def greet(name):\n\treturn "Hello " + name\nend\n'
+
+
+@pytest.fixture
+def server(tmpdir):
+	instance = TranslationServer(str(tmpdir.join('dsl.sock')))
+	thread = Thread(target=instance.serve_forever)
+	thread.daemon = True
+	thread.start()
+	
+	yield instance
+	
+	instance.shutdown()
+	instance.server_close()
+
+
+class TestServer(object):
+	def test_translation(self, server):
+		client = Client(server.server_address)
+		
+		try:
+			assert client.translate(SOURCE, 'sample.nomap') == translate_locally(SOURCE, 'sample.nomap')
+			assert client.connection is not None
+		finally:
+			client.close()
+	
+	def test_private(self, server):
+		assert stat.S_IMODE(os.stat(server.server_address).st_mode) == 0o600
+	
+	def test_refuses_live_socket(self, server):
+		with pytest.raises(OSError):
+			TranslationServer(server.server_address)
+		
+		assert os.path.exists(server.server_address)
+	
+	def test_replaces_stale_socket(self, tmpdir):
+		path = str(tmpdir.join('dsl.sock'))
+		stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		stale.bind(path)
+		stale.close()
+		
+		instance = TranslationServer(path)
+		instance.server_close()
+	
+	def test_refuses_shared_directory(self, tmpdir):
+		tmpdir.chmod(0o777)
+		
+		with pytest.raises(OSError):
+			TranslationServer(str(tmpdir.join('dsl.sock')))
+	
+	def test_default_directory(self, tmpdir, monkeypatch):
+		monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+		monkeypatch.setattr(serve, 'gettempdir', lambda: str(tmpdir))
+		
+		instance = TranslationServer()
+		
+		try:
+			assert instance.server_address == default_path()
+			assert stat.S_IMODE(os.stat(os.path.dirname(default_path())).st_mode) == 0o700
+		finally:
+			instance.server_close()
+
+
+class TestClient(object):
+	def test_fallback(self, tmpdir):
+		client = Client(str(tmpdir.join('absent.sock')))
+		
+		assert client.translate(SOURCE, 'sample.nomap') == translate_locally(SOURCE, 'sample.nomap')
+		assert client.connection is None
+	
+	def test_ignores_other_users(self, server, monkeypatch):
+		uid = os.getuid()
+		client = Client(server.server_address)
+		monkeypatch.setattr(os, 'getuid', lambda: uid + 1)
+		
+		assert client.translate(SOURCE, 'sample.nomap') == translate_locally(SOURCE, 'sample.nomap')
+		assert client.connection is None
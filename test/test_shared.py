@@ -0,0 +1,125 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import os
+from hashlib import sha1
+
+import pytest
+
+from marrow.dsl.compiler import Compiler
+from marrow.dsl.shared import SEQUENCE, SharedCache
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="requires fork")
+
+SOURCE = '''def greet(name):
+	return "Hello " + name
+end
+'''
+
+
+def key(value):
+	return sha1(value.encode('utf8')).digest()
+
+
+def forked(fn):
+	"""Call a function within a forked child process, returning its exit status: zero if it returned truthy."""
+	
+	pid = os.fork()
+	
+	if not pid:
+		try:
+			os._exit(0 if fn() else 1)
+		except BaseException:
+			os._exit(2)
+	
+	return os.waitpid(pid, 0)[1]
+
+
+class TestSharedCache(object):
+	def test_child_write(self):
+		cache = SharedCache(1024, slots=16)
+		
+		assert forked(lambda: cache.set(key('a'), b"alpha")) == 0
+		assert cache.get(key('a')) == b"alpha"
+		assert cache.hits == 1
+	
+	def test_child_read(self):
+		cache = SharedCache(1024, slots=16)
+		cache.set(key('a'), b"alpha")
+		
+		assert forked(lambda: cache.get(key('a')) == b"alpha") == 0
+		assert forked(lambda: cache.get(key('b')) is None) == 0
+	
+	def test_lock_free(self):
+		cache = SharedCache(1024, slots=16)
+		cache.set(key('a'), b"alpha")
+		
+		with cache.lock:  # As if held by a worker that exited while writing.
+			assert cache.get(key('a')) == b"alpha"
+	
+	def test_writing(self):
+		cache = SharedCache(1024, slots=16)
+		cache.set(key('a'), b"alpha")
+		offset = cache._slot(key('a'))
+		sequence = SEQUENCE.unpack_from(cache.memory, offset)[0]
+		SEQUENCE.pack_into(cache.memory, offset, sequence | 1)  # Mid-write.
+		
+		assert cache.get(key('a')) is None
+	
+	def test_miss(self):
+		cache = SharedCache(1024, slots=16)
+		
+		assert cache.get(key('a')) is None
+		assert cache.get(key('a'), b"default") == b"default"
+		assert cache.misses == 2
+	
+	def test_eviction(self):
+		cache = SharedCache(256, slots=64)
+		
+		for i in range(8):
+			assert forked(lambda: cache.set(key(str(i)), str(i).encode('ascii') * 40)) == 0
+		
+		assert cache.get(key('0')) is None  # Overwritten within the ring by later values.
+		assert cache.get(key('7')) == b"7" * 40
+	
+	def test_too_large(self):
+		cache = SharedCache(64, slots=16)
+		
+		assert not cache.set(key('a'), b"a" * 64)
+		assert cache.get(key('a')) is None
+	
+	def test_clear(self):
+		cache = SharedCache(1024, slots=16)
+		cache.set(key('a'), b"alpha")
+		
+		assert forked(lambda: cache.clear() is None) == 0
+		assert cache.get(key('a')) is None
+		
+		cache.set(key('a'), b"again")
+		
+		assert forked(lambda: cache.get(key('a')) == b"again") == 0
+
+
+class TestCompiler(object):
+	def test_shared(self):
+		shared = SharedCache(64 * 1024, slots=16)
+		
+		assert forked(lambda: Compiler(shared=shared).compile(SOURCE, 'sample')) == 0
+		
+		compiler = Compiler(shared=shared)
+		compiler.compile(SOURCE, 'sample')
+		
+		assert shared.hits == 1
+	
+	def test_directory_shared(self, tmpdir):
+		Compiler(directory=str(tmpdir)).compile(SOURCE, 'sample')
+		shared = SharedCache(64 * 1024, slots=16)
+		
+		assert forked(lambda: Compiler(directory=str(tmpdir), shared=shared).compile(SOURCE, 'sample')) == 0
+		
+		compiler = Compiler(shared=shared)  # No directory; found only if the child shared what it loaded.
+		compiler.compile(SOURCE, 'sample')
+		
+		assert shared.hits == 1
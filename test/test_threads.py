@@ -0,0 +1,62 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+from threading import Thread
+
+
+THREADS = 8
+ROUNDS = 20
+
+
+def source(i):
+	"""Generate a distinct module declaring functions sharing most of their lines with those of other modules."""
+	
+	return '\n'.join((
+			'import os',
+			'',
+			'def function_{}(a, b=None):'.format(i),
+			'\tvalue = os.path.join(a, b or "{}")'.format(i),
+			'\tif value:',
+			'\t\treturn value',
+			'\treturn None',
+			'end',
+			'',
+		))
+
+
+def concurrently(decoder, sources):
+	"""Translate each source repeatedly, from its own thread, all sharing one decoder; returns the outputs of each."""
+	
+	results = [[] for i in sources]
+	
+	def run(i):
+		for j in range(ROUNDS):
+			results[i].append(decoder.translate(sources[i])[0])
+	
+	threads = [Thread(target=run, args=(i, )) for i in range(len(sources))]
+	
+	for thread in threads:
+		thread.start()
+	
+	for thread in threads:
+		thread.join()
+	
+	return results
+
+
+class TestConcurrency(object):
+	def test_output(self, sample):
+		sources = [source(i) for i in range(THREADS)]
+		expected = [sample('nomap').translate(i)[0] for i in sources]
+		results = concurrently(sample('nomap', cache='16', incremental='4'), sources)
+		
+		for output, outputs in zip(expected, results):
+			assert outputs == [output] * ROUNDS
+	
+	def test_statistics(self, sample):
+		decoder = sample('nomap', cache='16')
+		concurrently(decoder, [source(i) for i in range(THREADS)])
+		
+		assert decoder.stats.translations == THREADS * ROUNDS
+		assert decoder.stats.hits + decoder.stats.misses == decoder.stats.lines
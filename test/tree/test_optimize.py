@@ -0,0 +1,95 @@
+# encoding: utf-8
+
+from __future__ import unicode_literals
+
+import pytest
+
+from marrow.dsl.core import Line
+from marrow.dsl.tree.common import transform, unparse
+from marrow.dsl.tree.optimize import FoldConstants, HoistLookups, MergeYields, passes
+
+
+pytestmark = pytest.mark.skipif(unparse is None, reason="requires ast.unparse")
+
+
+def optimize(source, spec):
+	"""Apply the named passes to the given function source, returning the text of the resulting lines."""
+	
+	lines = [Line(text, i + 1, len(text) - len(text.lstrip('\t'))) for i, text in enumerate(source.split('\n'))]
+	return '\n'.join(str(line) for line in transform(lines, passes(spec)))
+
+
+class TestPasses(object):
+	def test_all(self):
+		assert passes('all') == [FoldConstants, HoistLookups]
+	
+	def test_named(self):
+		assert passes('hoist-merge') == [MergeYields, HoistLookups]
+	
+	def test_unknown(self):
+		with pytest.raises(ValueError):
+			passes('bogus')
+
+
+class TestFoldConstants(object):
+	def test_negative_literal(self):
+		source = 'def f():\n\treturn -1'
+		
+		assert optimize(source, 'fold') == source
+	
+	def test_negative_result(self):
+		assert optimize('def f():\n\treturn 2 - 3', 'fold') == 'def f():\n\treturn -1'
+	
+	def test_negative_operand(self):
+		assert optimize('def f():\n\treturn -1 + 4 * 2', 'fold') == 'def f():\n\treturn 7'
+	
+	def test_negation(self):
+		assert optimize('def f():\n\treturn -(2 * 3)', 'fold') == 'def f():\n\treturn -6'
+
+
+class TestHoistLookups(object):
+	def test_hoist(self):
+		source = 'def f(items):\n\tresult = []\n\tresult.append(None)\n\tfor i in items:\n\t\tresult.append(i)'
+		
+		assert optimize(source, 'hoist').split('\n')[3:] == [
+				'\t_hoisted_result_append = result.append',
+				'\tfor i in items:',
+				'\t\t_hoisted_result_append(i)',
+			]
+	
+	def test_unperformed(self):
+		source = 'def f(items):\n\tresult = []\n\tfor i in items:\n\t\tresult.append(i)'
+		
+		assert optimize(source, 'hoist') == source
+	
+	def test_conditional(self):
+		source = 'def f(items, flag):\n\tresult = []\n\tflag and result.append(None)\n\tfor i in items:\n\t\t' \
+				'result.append(i)'
+		
+		assert optimize(source, 'hoist') == source
+	
+	def test_rebound(self):
+		source = 'def f(items):\n\tresult = []\n\tresult.append(None)\n\tresult = []\n\tfor i in items:\n\t\t' \
+				'result.append(i)'
+		
+		assert optimize(source, 'hoist') == source
+	
+	def test_global(self):
+		source = 'def f(items):\n\tlog.info(None)\n\tfor i in items:\n\t\tlog.info(i)\n\t\tlen(i)'
+		
+		assert optimize(source, 'hoist') == source
+	
+	def test_zero_iterations(self):
+		source = 'def f(items):\n\tif items:\n\t\tmissing()\n\tfor i in items:\n\t\tmissing(i)\n\treturn True'
+		namespace = {}
+		exec(optimize(source, 'hoist'), namespace)
+		
+		assert namespace['f']([])
+
+
+class TestMergeYields(object):
+	def test_merge(self):
+		source = 'def f():\n\tyield "a"\n\tyield "b"'
+		
+		assert optimize(source, 'merge') == 'def f():\n\tyield \'ab\''
+		assert optimize(source, 'all') == source